@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Scor Indel (echivalent rapidfuzz.fuzz.ratio) pentru instalari fara rapidfuzz.
+LCS bit-paralel (Allison-Dix / Hyyro): fiecare caracter din text actualizeaza
+toate pozitiile din pattern deodata, printr-o adunare si o scadere pe biti.
+Cu numba, kernel-ul din _fast_ratio_numba e compilat pe blocuri uint64 si
+paralelizat pe linii; fara numba, aceeasi recurenta ruleaza pe int-urile Python
+(precizie arbitrara).
+"""
+
+# Modulul _fast_ratio_numba dupa primul import reusit, False daca numba lipseste.
+# Importul numba costa sute de ms - se face doar cand fallback-ul chiar ruleaza
+_numba = None
+
+
+def _numba_module():
+    """_fast_ratio_numba (importat la prima folosire), sau None fara numba"""
+    global _numba
+    if _numba is None:
+        try:
+            import _fast_ratio_numba
+            _numba = _fast_ratio_numba
+        except ImportError:
+            _numba = False
+    return _numba or None
+
+
+def has_numba():
+    """True daca kernel-ul compilat e disponibil"""
+    return _numba_module() is not None
+
+
+def default_process(text):
+    """Ca rapidfuzz.utils.default_process: lowercase, non-alfanumeric -> spatiu, trim"""
+    return "".join(ch if ch.isalnum() else " " for ch in text.lower()).strip()
+
+
+def _pattern_masks(pattern):
+    """Caracter -> masca de biti a pozitiilor lui in pattern"""
+    masks = {}
+    bit = 1
+    for ch in pattern:
+        masks[ch] = masks.get(ch, 0) | bit
+        bit <<= 1
+    return masks
+
+
+def _lcs_length(masks, pattern_len, text):
+    """Lungimea LCS dintre pattern (dat prin masti) si text"""
+    full = (1 << pattern_len) - 1
+    v = full
+    for ch in text:
+        m = masks.get(ch)
+        if m:
+            u = v & m
+            v = ((v + u) | (v - u)) & full
+    return pattern_len - bin(v).count("1")
+
+
+def ratio(a, b):
+    """Similaritate normalizata 0-1: 2 * LCS / (len(a) + len(b))"""
+    total = len(a) + len(b)
+    if not total:
+        return 1.0
+    return 2 * _lcs_length(_pattern_masks(a), len(a), b) / total
+
+
+def best_matches(queries, choices, min_score):
+    """Cel mai bun (index, scor) din choices pentru fiecare interogare, sau None"""
+    if queries and choices and has_numba():
+        return _numba_module().best_matches(queries, choices, min_score)
+
+    best = []
+    for query in queries:
+        masks = _pattern_masks(query)
+        la = len(query)
+        best_match = None
+        for j, choice in enumerate(choices):
+            total = la + len(choice)
+            if not total:
+                score = 1.0
+            else:
+                # Limita superioara din lungimi - sare peste perechile fara sansa
+                floor = min_score if best_match is None else best_match[1]
+                if 2 * min(la, len(choice)) / total < floor:
+                    continue
+                score = 2 * _lcs_length(masks, la, choice) / total
+
+            if score >= min_score and (best_match is None or score > best_match[1]):
+                best_match = (j, score)
+
+        best.append(best_match)
+
+    return best
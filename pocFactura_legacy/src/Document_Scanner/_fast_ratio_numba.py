@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Kernel-ul numba pentru _fast_ratio: LCS bit-paralel pe blocuri uint64, paralelizat
+pe linii. Importat doar la nevoie - ImportError aici inseamna fallback Python pur.
+"""
+
+import numpy as np
+from numba import njit, prange
+
+
+def best_matches(queries, choices, min_score):
+    """Codifica sirurile ca ID-uri de caractere si ruleaza kernel-ul compilat"""
+    # Alfabetul vine din interogari; caracterele doar din choices primesc ID 0 (masca nula)
+    alphabet = {}
+    for query in queries:
+        for ch in query:
+            alphabet.setdefault(ch, len(alphabet) + 1)
+
+    max_q = max(len(q) for q in queries)
+    n_blocks = max(1, (max_q + 63) // 64)
+    pm = np.zeros((len(queries), len(alphabet) + 1, n_blocks), dtype=np.uint64)
+    q_len = np.array([len(q) for q in queries], dtype=np.int64)
+    for i, query in enumerate(queries):
+        for pos, ch in enumerate(query):
+            pm[i, alphabet[ch], pos // 64] |= np.uint64(1) << np.uint64(pos % 64)
+
+    t_len = np.array([len(c) for c in choices], dtype=np.int64)
+    texts = np.zeros((len(choices), max(1, int(t_len.max()))), dtype=np.int64)
+    for j, choice in enumerate(choices):
+        texts[j, :len(choice)] = [alphabet.get(ch, 0) for ch in choice]
+
+    best_idx = np.full(len(queries), -1, dtype=np.int64)
+    best_score = np.zeros(len(queries), dtype=np.float64)
+    _lcs_kernel(pm, q_len, texts, t_len, float(min_score), best_idx, best_score)
+
+    return [(int(j), float(score)) if j >= 0 else None
+            for j, score in zip(best_idx, best_score)]
+
+
+@njit(cache=True)
+def _popcount(x):
+    count = 0
+    while x:
+        x &= x - np.uint64(1)
+        count += 1
+    return count
+
+
+@njit(parallel=True, cache=True)
+def _lcs_kernel(pm, q_len, texts, t_len, min_score, best_idx, best_score):
+    all_ones = ~np.uint64(0)
+    for i in prange(pm.shape[0]):
+        la = q_len[i]
+        nb = max(1, (la + 63) // 64)
+        v = np.empty(nb, dtype=np.uint64)
+        bi = -1
+        bs = 0.0
+        for j in range(texts.shape[0]):
+            lb = t_len[j]
+            total = la + lb
+            if total == 0:
+                score = 1.0
+            else:
+                floor = min_score if bi < 0 else bs
+                if 2.0 * min(la, lb) / total < floor:
+                    continue
+
+                for w in range(nb):
+                    v[w] = all_ones
+                for k in range(lb):
+                    c = texts[j, k]
+                    carry = np.uint64(0)
+                    for w in range(nb):
+                        x = v[w]
+                        u = x & pm[i, c, w]
+                        s1 = x + u
+                        s2 = s1 + carry
+                        carry = np.uint64(1) if (s1 < x or s2 < s1) else np.uint64(0)
+                        v[w] = s2 | (x - u)
+
+                # Zerourile din primii la biti ai lui v = lungimea LCS
+                ones = 0
+                for w in range(nb):
+                    bits = min(64, la - 64 * w)
+                    word = v[w]
+                    if bits < 64:
+                        word &= (np.uint64(1) << np.uint64(bits)) - np.uint64(1)
+                    ones += _popcount(word)
+                score = 2.0 * (la - ones) / total
+
+            if score >= min_score and (bi < 0 or score > bs):
+                bi = j
+                bs = score
+
+        best_idx[i] = bi
+        best_score[i] = bs
@@ -7,117 +7,161 @@ Aplicatie moderna cu standardizare automata si extractie inventory
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, font
 import json
+import csv
 import os
-import pandas as pd
 from datetime import datetime
 from pathlib import Path
 import shutil
-from difflib import SequenceMatcher
-import xml.etree.ElementTree as ET
+import subprocess
+import hashlib
+import sqlite3
+from contextlib import closing
 import math
+import bisect
+import threading
+import logging
+import queue
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+
+try:
+    import numpy as np
+    from rapidfuzz import process, fuzz, utils
+except ImportError:
+    # rapidfuzz lipseste - matching-ul foloseste _fast_ratio (acelasi scor)
+    process = None
+    import _fast_ratio
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+logger = logging.getLogger(__name__)
 
 
-# ==================== ALGORITMI CLASICI ====================
+# ==================== INVOICE PROCESSING ====================
 
-def merge_sort(arr, key=lambda x: x):
-    """Merge Sort - O(n log n) - Sortare alfabetica"""
-    if len(arr) <= 1:
-        return arr
+UBL_NS = {
+    'cbc': 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2',
+    'cac': 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2'
+}
+UBL_INVOICE_LINE = '{%s}InvoiceLine' % UBL_NS['cac']
+
+
+def _invoice_line_dict(i, item):
+    """Construieste dict-ul unei linii din elementul cac:InvoiceLine"""
+    return {
+        "line_id": str(i),
+        "description": item.findtext('cac:Item/cbc:Description', default='', namespaces=UBL_NS),
+        "quantity": item.findtext('cbc:InvoicedQuantity', default='0', namespaces=UBL_NS),
+        "unit_price": item.findtext('cac:Price/cbc:PriceAmount', default='0', namespaces=UBL_NS),
+        "line_total": item.findtext('cbc:LineExtensionAmount', default='0', namespaces=UBL_NS)
+    }
 
-    mid = len(arr) // 2
-    left = merge_sort(arr[:mid], key)
-    right = merge_sort(arr[mid:], key)
 
-    return merge(left, right, key)
+def extract_lines_from_xml(xml_path):
+    """Extrage linii din factura XML (UBL format)"""
+    if etree is None:
+        return _extract_lines_elementtree(xml_path)
 
+    # Parsare in flux: fiecare InvoiceLine e eliberat dupa citire.
+    # Entitatile externe si reteaua sunt oprite explicit (lxml < 5 le rezolva implicit)
+    lines = []
+    context = etree.iterparse(str(xml_path), events=('end',), tag=UBL_INVOICE_LINE,
+                              resolve_entities=False, no_network=True)
+    for i, (_, item) in enumerate(context, 1):
+        lines.append(_invoice_line_dict(i, item))
 
-def merge(left, right, key):
-    """Helper pentru Merge Sort"""
-    result = []
-    i = j = 0
+        item.clear(keep_tail=True)
+        while item.getprevious() is not None:
+            del item.getparent()[0]
 
-    while i < len(left) and j < len(right):
-        if key(left[i]).lower() <= key(right[j]).lower():
-            result.append(left[i])
-            i += 1
-        else:
-            result.append(right[j])
-            j += 1
+    return lines
 
-    result.extend(left[i:])
-    result.extend(right[j:])
-    return result
 
+def _extract_lines_elementtree(xml_path):
+    """Fallback fara lxml - DOM complet cu xml.etree"""
+    import xml.etree.ElementTree as ET
 
-def linear_search_all(arr, target, key=lambda x: x):
-    """Linear Search - O(n) - Gaseste toate potrivirile"""
-    results = []
-    target_lower = target.lower()
+    tree = ET.parse(xml_path)
+    root = tree.getroot()
 
-    for i, item in enumerate(arr):
-        if target_lower in key(item).lower():
-            results.append(i)
+    return [_invoice_line_dict(i, item)
+            for i, item in enumerate(root.findall('.//cac:InvoiceLine', UBL_NS), 1)]
 
-    return results
 
+def prepare_reference(df_codes):
+    """Preproceseaza baza de date de referinta (o singura data per Excel)"""
+    if len(df_codes.columns) < 2:
+        raise ValueError("Excel-ul trebuie sa aiba minim 2 coloane (cod + descriere)")
 
-# ==================== INVOICE PROCESSING ====================
+    descriptions = df_codes.iloc[:, 1].tolist()
+    choices = [_normalize_description(d) for d in descriptions]
 
-def extract_lines_from_xml(xml_path):
-    """Extrage linii din factura XML (UBL format)"""
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-    ns = {
-        'cbc': 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2',
-        'cac': 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2'
+    # Descriere normalizata -> prima pozitie din tabel (pentru potrivirea exacta)
+    exact = {}
+    for j, choice in enumerate(choices):
+        exact.setdefault(choice, j)
+
+    return {
+        "codes": df_codes.iloc[:, 0].tolist(),
+        "descriptions": descriptions,
+        "choices": choices,
+        "exact": exact
     }
 
-    lines = []
-    for i, item in enumerate(root.findall('.//cac:InvoiceLine', ns), 1):
-        desc = item.findtext('cac:Item/cbc:Description', default='', namespaces=ns)
-        qty = item.findtext('cbc:InvoicedQuantity', default='0', namespaces=ns)
-        price = item.findtext('cac:Price/cbc:PriceAmount', default='0', namespaces=ns)
-        total = item.findtext('cbc:LineExtensionAmount', default='0', namespaces=ns)
-
-        lines.append({
-            "line_id": str(i),
-            "description": desc,
-            "quantity": qty,
-            "unit_price": price,
-            "line_total": total
-        })
 
-    return lines
+def _normalize_description(value):
+    """Forma comparata: default_process + cuvinte sortate (token_sort_ratio precalculat)"""
+    if process is not None:
+        processed = utils.default_process(str(value))
+    else:
+        processed = _fast_ratio.default_process(str(value))
+    return " ".join(sorted(processed.split()))
 
 
-def fuzzy_match_descriptions(lines, df_codes, min_score=0.18):
+def fuzzy_match_descriptions(lines, df_codes, min_score=0.18, reference=None):
     """Match descriptions cu fuzzy matching"""
     if len(df_codes.columns) < 2:
         raise ValueError("Excel-ul trebuie sa aiba minim 2 coloane (cod + descriere)")
 
-    code_col, desc_col = df_codes.columns[0], df_codes.columns[1]
+    if reference is None:
+        reference = prepare_reference(df_codes)
+
+    queries = [_normalize_description(line.get("description", "")) for line in lines]
+
+    # Runda 1: potrivire exacta prin dictionar, fara niciun calcul fuzzy
+    exact = reference["exact"]
+    best = [(exact[q], 1.0) if q in exact else None for q in queries]
+
+    # Runda 2: fuzzy doar pentru liniile ramase
+    pending = [i for i, match in enumerate(best) if match is None]
+    if pending:
+        pending_queries = [queries[i] for i in pending]
+        if process is not None:
+            fuzzy = _best_matches_rapidfuzz(pending_queries, reference["choices"], min_score)
+        else:
+            fuzzy = _best_matches_fallback(pending_queries, reference["choices"], min_score)
+
+        for i, match in zip(pending, fuzzy):
+            best[i] = match
+
+    codes = reference["codes"]
+    descriptions = reference["descriptions"]
 
     results = []
-    for line in lines:
-        input_desc = str(line.get("description", "")).lower()
-
-        matches = []
-        for _, row in df_codes.iterrows():
-            score = SequenceMatcher(None, input_desc, str(row[desc_col]).lower()).ratio()
-            if score >= min_score:
-                matches.append({
-                    "matched_code": row[code_col],
-                    "matched_description": row[desc_col],
-                    "score": round(score, 4)
-                })
-
-        matches.sort(key=lambda x: x["score"], reverse=True)
-
-        if matches:
-            best_match = matches[0]
-            line["matched_code"] = best_match["matched_code"]
-            line["matched_description"] = best_match["matched_description"]
-            line["score"] = best_match["score"]
+    for line, best_match in zip(lines, best):
+        if best_match:
+            j, score = best_match
+            line["matched_code"] = codes[j]
+            line["matched_description"] = descriptions[j]
+            line["score"] = round(score, 4)
             line["status"] = "matched"
         else:
             line["matched_code"] = None
@@ -130,8 +174,111 @@ def fuzzy_match_descriptions(lines, df_codes, min_score=0.18):
     return results
 
 
+def _best_matches_rapidfuzz(queries, choices, min_score):
+    """Cel mai bun (index, scor) pentru fiecare interogare, sau None"""
+    if not choices:
+        return [None] * len(queries)
+
+    # Matricea N x M de scoruri (0-100), calculata in C++ pe toate nucleele.
+    # Cuvintele sunt deja sortate, deci ratio aici este exact token_sort_ratio
+    scores = process.cdist(queries, choices,
+                           scorer=fuzz.ratio,
+                           score_cutoff=min_score * 100,
+                           workers=-1,
+                           dtype=np.float32)
+    best_idx = np.argmax(scores, axis=1)
+    best_scores = scores[np.arange(len(queries)), best_idx]
+
+    return [(int(j), float(score) / 100) if score >= min_score * 100 else None
+            for j, score in zip(best_idx, best_scores)]
+
+
+# Sub acest numar de perechi (linii x referinte) pornirea proceselor costa mai mult
+FALLBACK_PARALLEL_MIN_PAIRS = 1_000_000
+
+
+def _best_matches_fallback(queries, choices, min_score):
+    """Fallback fara rapidfuzz - LCS bit-paralel din _fast_ratio"""
+    workers = os.cpu_count() or 1
+    # Kernel-ul numba e deja paralel; varianta Python pura o impartim pe procese
+    if (not _fast_ratio.has_numba() and workers > 1
+            and len(queries) * len(choices) >= FALLBACK_PARALLEL_MIN_PAIRS):
+        # Liniile facturii sunt independente - fiecare proces primeste un segment
+        chunk = -(-len(queries) // workers)
+        chunks = [queries[k:k + chunk] for k in range(0, len(queries), chunk)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = executor.map(_fast_ratio.best_matches, chunks, repeat(choices), repeat(min_score))
+            return [match for part in parts for match in part]
+
+    return _fast_ratio.best_matches(queries, choices, min_score)
+
+
 # ==================== DATA MANAGER ====================
 
+# Coloanele din CSV-urile standardizate care intra in inventar
+INVENTORY_COLUMNS = ('matched_description', 'quantity')
+
+
+def _arrow_csv():
+    """Modulul pyarrow.csv daca e instalat (importat la prima folosire), altfel None"""
+    try:
+        import pyarrow.csv as pacsv
+    except ImportError:
+        return None
+    return pacsv
+
+
+def _csv_inventory_sums(csv_path):
+    """Cantitatile totale per material dintr-un CSV standardizat (None fara coloanele necesare)"""
+    import pandas as pd
+
+    pacsv = _arrow_csv()
+    if pacsv is not None:
+        sums = _arrow_inventory_sums(pacsv, csv_path)
+        if sums is not None:
+            return pd.Series(*sums).dropna()
+
+    # Doar cele doua coloane folosite; lipsa lor nu ridica eroare
+    df = pd.read_csv(csv_path, usecols=INVENTORY_COLUMNS.__contains__,
+                     dtype={'matched_description': str})
+
+    if len(df.columns) != len(INVENTORY_COLUMNS):
+        return None
+
+    df = df.dropna(subset=['matched_description'])
+    # Deja float64 cand coloana e curata; altfel valorile invalide devin NaN
+    df['quantity'] = pd.to_numeric(df['quantity'], errors='coerce')
+    return df.groupby('matched_description')['quantity'].sum(min_count=1).dropna()
+
+
+def _arrow_inventory_sums(pacsv, csv_path):
+    """Agregarea cu parserul si group_by din pyarrow: (sume, descrieri) sau None daca
+    fisierul trebuie citit cu pandas (coloane lipsa sau cantitati nenumerice)"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    table = pacsv.read_csv(csv_path, convert_options=pacsv.ConvertOptions(
+        include_columns=list(INVENTORY_COLUMNS),
+        include_missing_columns=True,
+        column_types={'matched_description': pa.string()},
+        strings_can_be_null=True,
+    ))
+
+    qty_type = table.schema.field('quantity').type
+    if not (pa.types.is_integer(qty_type) or pa.types.is_floating(qty_type)):
+        return None
+
+    grouped = table.group_by('matched_description').aggregate(
+        [('quantity', 'sum', pc.ScalarAggregateOptions(min_count=1))]
+    )
+    return (grouped['quantity_sum'].cast(pa.float64()).to_numpy(zero_copy_only=False),
+            grouped['matched_description'].to_pylist())
+
+
+DOCUMENT_FIELDS = ("name", "csv_filename", "date", "lines_count", "matched_count")
+_INSERT_DOCUMENT = ("INSERT INTO documents(" + ", ".join(DOCUMENT_FIELDS) + ") VALUES ("
+                    + ", ".join("?" * len(DOCUMENT_FIELDS)) + ")")
+
 class DataManager:
     """Gestioneaza datele aplicatiei"""
 
@@ -139,23 +286,45 @@ class DataManager:
         self.data_dir = Path("app_data")
         self.docs_dir = self.data_dir / "documents"
         self.csv_dir = self.data_dir / "csv_standardized"
-        self.data_file = self.data_dir / "data.json"
+        self.cache_dir = self.data_dir / "cache"
+        self.data_file = self.data_dir / "data.json"  # format vechi, doar pentru import
+        self.db_file = self.data_dir / "data.db"
 
         self.data_dir.mkdir(exist_ok=True)
         self.docs_dir.mkdir(exist_ok=True)
         self.csv_dir.mkdir(exist_ok=True)
+        self.cache_dir.mkdir(exist_ok=True)
 
         self.data = self.load_data()
 
+        # Nume lowercase paralele cu data["documents"] (sortate la fel)
+        self.data["documents"].sort(key=lambda d: d["name"].lower())
+        self._reindex_documents()
+
+        # Cache pentru baza de referinta: cale completa -> ((mtime_ns, marime), df_codes, reference)
+        self._excel_cache = {}
+
     def load_data(self):
+        """Incarca datele din SQLite (importa data.json la prima pornire)"""
+        db_exists = self.db_file.exists()
+        self._init_db()
+
+        if db_exists:
+            return self._read_db()
+
+        data = self._load_json()
+        self.data = data
+        self.save_data()
+        return data
+
+    def _load_json(self):
         """Incarca datele din JSON"""
         if self.data_file.exists():
             try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                    if not content:
-                        return {"documents": [], "inventory": {}}
-                    data = json.loads(content)
+                content = self.data_file.read_bytes().strip()
+                if not content:
+                    return {"documents": [], "inventory": {}}
+                data = orjson.loads(content) if orjson else json.loads(content)
 
                 data = self._migrate_old_data(data)
                 return data
@@ -165,6 +334,40 @@ class DataManager:
 
         return {"documents": [], "inventory": {}}
 
+    def _connect(self):
+        """Conexiune noua per operatie - sigura si din thread-ul de procesare"""
+        return closing(sqlite3.connect(self.db_file))
+
+    def _init_db(self):
+        """Creeaza tabelele daca lipsesc"""
+        with self._connect() as conn, conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    csv_filename TEXT,
+                    date TEXT,
+                    lines_count INTEGER,
+                    matched_count INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS idx_documents_name ON documents(name);
+                CREATE TABLE IF NOT EXISTS inventory (
+                    description TEXT PRIMARY KEY,
+                    quantity REAL NOT NULL
+                );
+            """)
+
+    def _read_db(self):
+        """Citeste documentele si inventarul din SQLite"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            documents = [dict(row) for row in conn.execute(
+                "SELECT " + ", ".join(DOCUMENT_FIELDS) + " FROM documents ORDER BY id"
+            )]
+            inventory = dict(conn.execute("SELECT description, quantity FROM inventory"))
+
+        return {"documents": documents, "inventory": inventory}
+
     def _migrate_old_data(self, data):
         """Migreaza date din formatul vechi la cel nou"""
         if "documents" not in data:
@@ -201,9 +404,14 @@ class DataManager:
         return data
 
     def save_data(self):
-        """Salveaza datele in JSON"""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        """Rescrie toate datele din memorie in SQLite (o singura tranzactie)"""
+        with self._connect() as conn, conn:
+            conn.execute("DELETE FROM documents")
+            conn.executemany(_INSERT_DOCUMENT, ([d.get(f) for f in DOCUMENT_FIELDS]
+                                                for d in self.data["documents"]))
+            conn.execute("DELETE FROM inventory")
+            conn.executemany("INSERT INTO inventory(description, quantity) VALUES (?, ?)",
+                             self.data["inventory"].items())
 
     def process_invoice(self, xml_path, excel_path, progress_callback=None):
         """Proceseaza factura: extract -> match -> save CSV -> update inventory"""
@@ -218,13 +426,13 @@ class DataManager:
             progress_callback(f"Gasit {len(lines)} linii. Incarcare baza date...")
 
         # Load codes
-        df_codes = pd.read_excel(excel_path)
+        df_codes, reference = self._load_reference(excel_path)
 
         if progress_callback:
             progress_callback("Matching fuzzy in desfasurare...")
 
         # Match
-        standardized = fuzzy_match_descriptions(lines, df_codes)
+        standardized = fuzzy_match_descriptions(lines, df_codes, reference=reference)
 
         if progress_callback:
             progress_callback("Salvare CSV standardizat...")
@@ -235,25 +443,30 @@ class DataManager:
         csv_filename = f"{timestamp}_{xml_name}_standardized.csv"
         csv_path = self.csv_dir / csv_filename
 
-        df_output = pd.DataFrame(standardized)
-        df_output.to_csv(csv_path, index=False, encoding="utf-8")
+        # Scriere directa rand cu rand, fara DataFrame intermediar
+        fieldnames = list(dict.fromkeys(key for item in standardized for key in item))
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(standardized)
 
         if progress_callback:
             progress_callback("Actualizare inventory...")
 
-        # Update inventory
+        # Update inventory - cantitatile se agrega intai per material
+        updates = {}
         for item in standardized:
             if item.get("matched_description") and item.get("quantity"):
                 desc = item["matched_description"]
                 try:
-                    qty = float(item["quantity"])
-                    if desc in self.data["inventory"]:
-                        self.data["inventory"][desc] += qty
-                    else:
-                        self.data["inventory"][desc] = qty
+                    updates[desc] = updates.get(desc, 0.0) + float(item["quantity"])
                 except ValueError:
                     pass
 
+        inventory = self.data["inventory"]
+        for desc, qty in updates.items():
+            inventory[desc] = inventory.get(desc, 0.0) + qty
+
         # Add document
         doc = {
             "name": xml_name,
@@ -262,25 +475,96 @@ class DataManager:
             "lines_count": len(lines),
             "matched_count": sum(1 for x in standardized if x["status"] == "matched")
         }
-        self.data["documents"].append(doc)
-
-        # Sorteaza cu Merge Sort
-        self.data["documents"] = merge_sort(self.data["documents"], key=lambda x: x["name"])
-
-        self.save_data()
+        # Insertie binara - lista ramane sortata dupa nume, fara resortare
+        name_lower = doc["name"].lower()
+        pos = bisect.bisect_right(self._doc_names_lower, name_lower)
+        self.data["documents"].insert(pos, doc)
+        self._doc_names_lower.insert(pos, name_lower)
+        self._docs_by_name.setdefault(doc["name"], doc)
+
+        # Scriere incrementala: doar liniile facturii, nu tot istoricul
+        with self._connect() as conn, conn:
+            conn.executemany(
+                "INSERT INTO inventory(description, quantity) VALUES (?, ?) "
+                "ON CONFLICT(description) DO UPDATE SET quantity = quantity + excluded.quantity",
+                updates.items()
+            )
+            conn.execute(_INSERT_DOCUMENT, [doc[f] for f in DOCUMENT_FIELDS])
 
         if progress_callback:
             progress_callback("Complet!")
 
         return doc, csv_path
 
+    def _load_reference(self, excel_path):
+        """Incarca baza de referinta, refolosind-o cat timp Excel-ul nu s-a modificat"""
+        source = Path(excel_path).resolve()
+        stat = source.stat()
+        # mtime + marime: o copie cu mtime mai vechi (copy/unzip pe Windows) tot invalideaza
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._excel_cache.get(source)
+
+        if cached is None or cached[0] != signature:
+            df_codes = self._read_reference_table(source, signature)
+            cached = (signature, df_codes, prepare_reference(df_codes))
+            self._excel_cache[source] = cached
+
+        return cached[1], cached[2]
+
+    def _read_reference_table(self, excel_path, signature):
+        """Citeste primele 2 coloane din Excel, prin cache parquet cand e posibil"""
+        import pandas as pd
+
+        # Cheia e calea completa - doua Excel-uri cu acelasi nume nu se mai amesteca
+        key = hashlib.blake2b(str(excel_path).encode("utf-8"), digest_size=16).hexdigest()
+        cache_path = self.cache_dir / (key + ".parquet")
+        meta_path = self.cache_dir / (key + ".json")
+        meta = {"source": str(excel_path), "mtime_ns": signature[0], "size": signature[1]}
+
+        try:
+            fresh = json.loads(meta_path.read_text(encoding="utf-8")) == meta
+        except (OSError, ValueError):
+            fresh = False
+
+        if fresh:
+            try:
+                return pd.read_parquet(cache_path)
+            except Exception:
+                pass  # cache corupt sau fara pyarrow - recitim Excel-ul
+
+        try:
+            # python-calamine parseaza XLSX mult mai rapid decat openpyxl
+            df_codes = pd.read_excel(excel_path, dtype=str, engine="calamine")
+        except (ImportError, ValueError):
+            df_codes = pd.read_excel(excel_path, dtype=str)
+
+        # Fara usecols: un Excel cu o singura coloana primeste mesajul clar, nu eroarea pandas
+        if len(df_codes.columns) < 2:
+            raise ValueError("Excel-ul trebuie sa aiba minim 2 coloane (cod + descriere)")
+        df_codes = df_codes.iloc[:, :2]
+
+        # Metadatele se scriu abia dupa parquet - o scriere intrerupta nu lasa cache "valid"
+        meta_path.unlink(missing_ok=True)
+        try:
+            df_codes.to_parquet(cache_path, index=False)
+            meta_path.write_text(json.dumps(meta), encoding="utf-8")
+        except Exception:
+            cache_path.unlink(missing_ok=True)
+            meta_path.unlink(missing_ok=True)
+
+        return df_codes
+
     def search_documents(self, query):
         """Cauta documente"""
         if not query:
             return self.data["documents"]
 
-        indices = linear_search_all(self.data["documents"], query, key=lambda x: x["name"])
-        return [self.data["documents"][i] for i in indices]
+        q = query.lower()
+        return [d for d, name in zip(self.data["documents"], self._doc_names_lower) if q in name]
+
+    def get_document(self, name):
+        """Primul document cu numele dat, sau None"""
+        return self._docs_by_name.get(name)
 
     def delete_document(self, doc):
         """Sterge un document"""
@@ -289,11 +573,87 @@ class DataManager:
             csv_path.unlink()
 
         self.data["documents"] = [d for d in self.data["documents"] if d != doc]
-        self.save_data()
+        self._reindex_documents()
+
+        # Aceeasi regula ca in memorie: se sterg toate documentele egale cu doc
+        with self._connect() as conn, conn:
+            conn.execute(
+                "DELETE FROM documents WHERE " + " AND ".join(f"{f} IS ?" for f in DOCUMENT_FIELDS),
+                [doc.get(f) for f in DOCUMENT_FIELDS]
+            )
+
+    def _reindex_documents(self):
+        """Reconstruieste indexurile dupa nume (cautare si lookup direct)"""
+        self._doc_names_lower = [d["name"].lower() for d in self.data["documents"]]
+        self._docs_by_name = {}
+        for d in self.data["documents"]:
+            self._docs_by_name.setdefault(d["name"], d)
 
 
 # ==================== MODERN UI ====================
 
+# Peste atatea randuri, refresh-ul ascunde coloanele din Treeview cat insereaza
+BULK_INSERT_THRESHOLD = 500
+
+# Cate randuri tine vizualizatorul CSV in Treeview deodata
+VIEW_PAGE_SIZE = 200
+
+# Cate randuri citeste vizualizatorul CSV dintr-o data (blocuri pyarrow: in bytes)
+VIEW_CHUNK_ROWS = 50_000
+VIEW_CHUNK_BYTES = 4 << 20
+
+
+def _csv_row_chunks(csv_path):
+    """(coloane, generator de blocuri de randuri) - cu pyarrow daca exista, altfel pandas"""
+    pacsv = _arrow_csv()
+    if pacsv is not None:
+        import pyarrow as pa
+
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            columns = next(csv.reader(f), [])
+        # Toate coloanele ca text: valorile apar exact ca in fisier,
+        # iar tipul unei coloane nu se poate schimba de la un bloc la altul
+        reader = pacsv.open_csv(
+            csv_path,
+            read_options=pacsv.ReadOptions(block_size=VIEW_CHUNK_BYTES),
+            convert_options=pacsv.ConvertOptions(
+                column_types={name: pa.string() for name in columns}),
+        )
+
+        def batches():
+            try:
+                for batch in reader:
+                    yield list(zip(*(col.to_pylist() for col in batch.columns)))
+            finally:
+                reader.close()
+
+        return columns, batches()
+
+    import pandas as pd
+
+    reader = pd.read_csv(csv_path, chunksize=VIEW_CHUNK_ROWS)
+    try:
+        first = next(reader)
+    except Exception:
+        reader.close()
+        raise
+
+    def frames():
+        try:
+            yield first.to_numpy().tolist()
+            for chunk in reader:
+                yield chunk.to_numpy().tolist()
+        finally:
+            reader.close()
+
+    return list(first.columns), frames()
+
+
+def _preload_pandas():
+    """Importa pandas (~0.5s) fara sa blocheze afisarea ferestrei"""
+    import pandas  # noqa: F401
+
+
 class ModernApp:
     """Aplicatie moderna cu design profesional"""
 
@@ -326,12 +686,22 @@ class ModernApp:
         # Data manager
         self.data_manager = DataManager()
 
+        # Randurile din docs_tree: (document, iid) si cautarea programata
+        self._doc_items = []
+        self._search_after_id = None
+
+        # Mesaje de la thread-ul de procesare catre UI
+        self._status_queue = queue.Queue()
+
         # Setup style
         self.setup_style()
 
         # Create UI
         self.create_ui()
 
+        # pandas se incarca in fundal, dupa ce fereastra exista deja
+        threading.Thread(target=_preload_pandas, daemon=True).start()
+
         # Refresh data
         self.refresh_documents()
         self.refresh_inventory()
@@ -622,7 +992,7 @@ class ModernApp:
         self.docs_tree.bind('<Double-1>', lambda e: self.open_csv_on_doubleclick())
 
         # Now add trace after treeview exists
-        self.search_var.trace('w', lambda *args: self.search_documents())
+        self.search_var.trace('w', lambda *args: self._schedule_search())
 
         # Action buttons below
         btn_frame = tk.Frame(frame, bg=self.colors['bg'])
@@ -813,21 +1183,42 @@ class ModernApp:
 
         animate()
 
-        def progress(msg):
-            if loading_window.winfo_exists():
-                status_label.config(text=msg)
-                loading_window.update()
+        # Pipeline-ul ruleaza pe un thread; Tk e atins doar din _drain_status
+        threading.Thread(target=self._run_pipeline, args=(xml_path, excel_path),
+                         daemon=True).start()
+        self.root.after(50, self._drain_status, loading_window, status_label)
+
+    def _run_pipeline(self, xml_path, excel_path):
+        """Thread de lucru: trimite progresul si rezultatul prin _status_queue"""
+        try:
+            doc, _ = self.data_manager.process_invoice(
+                xml_path, excel_path,
+                lambda msg: self._status_queue.put(('progress', msg))
+            )
+            self._status_queue.put(('done', doc))
+        except Exception as e:
+            self._status_queue.put(('error', e))
 
-        def process_thread():
+    def _drain_status(self, loading_window, status_label):
+        """Poller pe thread-ul Tk: aplica mesajele venite de la _run_pipeline"""
+        while True:
             try:
-                doc, csv_path = self.data_manager.process_invoice(
-                    xml_path, excel_path, progress
-                )
+                kind, payload = self._status_queue.get_nowait()
+            except queue.Empty:
+                break
 
-                # Close loading window
+            if kind == 'progress':
                 if loading_window.winfo_exists():
-                    loading_window.destroy()
+                    status_label.config(text=payload)
+                continue
+
+            # Close loading window
+            if loading_window.winfo_exists():
+                loading_window.destroy()
+            self.process_btn.config(state='normal')
 
+            if kind == 'done':
+                doc = payload
                 self.status_label.config(text='Procesare completa', fg=self.colors['accent'])
 
                 messagebox.showinfo(
@@ -841,22 +1232,12 @@ class ModernApp:
                 self.refresh_documents()
                 self.refresh_inventory()
                 self.notebook.select(1)
-
-            except Exception as e:
-                # Close loading window
-                if loading_window.winfo_exists():
-                    loading_window.destroy()
-
+            else:
                 self.status_label.config(text='Eroare', fg='#d93025')
-                messagebox.showerror('Eroare', f'Procesare esuata:\n{str(e)}')
-
-            finally:
-                self.process_btn.config(state='normal')
+                messagebox.showerror('Eroare', f'Procesare esuata:\n{str(payload)}')
+            return
 
-        # Run in thread to keep UI responsive
-        import threading
-        thread = threading.Thread(target=process_thread, daemon=True)
-        thread.start()
+        self.root.after(50, self._drain_status, loading_window, status_label)
 
     def _blend_color(self, color1, color2, alpha):
         """Blend two hex colors"""
@@ -871,32 +1252,51 @@ class ModernApp:
 
     def refresh_documents(self):
         """Refresh documents list"""
-        for item in self.docs_tree.get_children():
-            self.docs_tree.delete(item)
+        tree = self.docs_tree
+        documents = self.data_manager.data["documents"]
+
+        # Detasam randurile vizibile, apoi stergem intr-un singur apel
+        # (inclusiv cele detasate de o cautare anterioara)
+        tree.detach(*tree.get_children())
+        tree.delete(*[iid for _, iid in self._doc_items])
+
+        # La liste mari ascundem coloanele cat timp inseram, ca Tk sa nu
+        # recalculeze layout-ul randurilor la fiecare insert
+        bulk = len(documents) > BULK_INSERT_THRESHOLD
+        if bulk:
+            display_columns = tree['displaycolumns']
+            tree.configure(displaycolumns=())
 
-        for doc in self.data_manager.data["documents"]:
-            self.docs_tree.insert('', 'end', values=(
-                doc.get("name", "Unknown"),
-                doc.get("date", "N/A"),
-                doc.get("lines_count", 0),
-                doc.get("matched_count", 0)
-            ), tags=(doc.get("csv_filename", ""),))
+        try:
+            self._doc_items = []
+            for doc in documents:
+                iid = tree.insert('', 'end', values=(
+                    doc.get("name", "Unknown"),
+                    doc.get("date", "N/A"),
+                    doc.get("lines_count", 0),
+                    doc.get("matched_count", 0)
+                ), tags=(doc.get("csv_filename", ""),))
+                self._doc_items.append((doc, iid))
+        finally:
+            if bulk:
+                tree.configure(displaycolumns=display_columns)
+
+    def _schedule_search(self):
+        """Debounce: cauta doar dupa 150ms fara taste noi"""
+        if self._search_after_id:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(150, self.search_documents)
 
     def search_documents(self):
         """Search documents"""
+        self._search_after_id = None
         query = self.search_var.get()
-        results = self.data_manager.search_documents(query)
-
-        for item in self.docs_tree.get_children():
-            self.docs_tree.delete(item)
+        results = {id(doc) for doc in self.data_manager.search_documents(query)}
 
-        for doc in results:
-            self.docs_tree.insert('', 'end', values=(
-                doc.get("name", "Unknown"),
-                doc.get("date", "N/A"),
-                doc.get("lines_count", 0),
-                doc.get("matched_count", 0)
-            ), tags=(doc.get("csv_filename", ""),))
+        # Randurile exista deja - doar le detasam/reatasam, fara reinserare
+        visible = [iid for doc, iid in self._doc_items if id(doc) in results]
+        if visible != list(self.docs_tree.get_children()):
+            self.docs_tree.set_children('', *visible)
 
     def show_docs_menu(self, event):
         """Show context menu on right-click"""
@@ -923,7 +1323,8 @@ class ModernApp:
         csv_path = self.data_manager.csv_dir / csv_filename
 
         if csv_path.exists():
-            os.startfile(csv_path)
+            # Asocierea de fisier se rezolva in shell - nu blocam bucla Tk
+            threading.Thread(target=os.startfile, args=(str(csv_path),), daemon=True).start()
         else:
             messagebox.showerror('Eroare', 'Fisierul CSV nu a fost gasit')
 
@@ -936,22 +1337,21 @@ class ModernApp:
 
         # Get csv_filename from tags
         item_tags = self.docs_tree.item(selection[0])['tags']
-        print(f"DEBUG: item_tags = {item_tags}")
+        logger.debug("item_tags = %s", item_tags)
 
         if not item_tags:
             messagebox.showinfo('Info', 'Nu exista fisier CSV (tags empty)')
             return
 
         csv_filename = item_tags[0] if item_tags else None
-        print(f"DEBUG: csv_filename = {csv_filename}")
+        logger.debug("csv_filename = %s", csv_filename)
 
         if not csv_filename:
             messagebox.showinfo('Info', 'Nu exista fisier CSV (filename empty)')
             return
 
         csv_path = self.data_manager.csv_dir / csv_filename
-        print(f"DEBUG: csv_path = {csv_path}")
-        print(f"DEBUG: exists = {csv_path.exists()}")
+        logger.debug("csv_path = %s", csv_path)
 
         if not csv_path.exists():
             messagebox.showerror('Eroare', f'Fisierul CSV nu a fost gasit:\n{csv_path}')
@@ -963,10 +1363,11 @@ class ModernApp:
         viewer.geometry("1000x600")
         viewer.configure(bg=self.colors['bg'])
 
-        # Read CSV
+        # Read CSV - primul bloc se afiseaza imediat, restul se incarca din bucla Tk
         try:
-            df = pd.read_csv(csv_path)
-            print(f"DEBUG: CSV loaded, shape = {df.shape}")
+            columns, chunks = _csv_row_chunks(csv_path)
+            first_rows = next(chunks, [])
+            logger.debug("CSV first chunk loaded, rows = %d", len(first_rows))
         except Exception as e:
             messagebox.showerror('Eroare', f'Nu s-a putut citi CSV:\n{str(e)}')
             viewer.destroy()
@@ -983,23 +1384,89 @@ class ModernApp:
         scrollbar_x.pack(side='bottom', fill='x')
 
         tree = ttk.Treeview(tree_frame,
-                            columns=list(df.columns),
+                            columns=columns,
                             show='headings',
-                            yscrollcommand=scrollbar_y.set,
                             xscrollcommand=scrollbar_x.set)
 
-        scrollbar_y.config(command=tree.yview)
         scrollbar_x.config(command=tree.xview)
 
-        for col in df.columns:
+        for col in columns:
             tree.heading(col, text=col)
             tree.column(col, width=150)
 
-        for _, row in df.iterrows():
-            tree.insert('', 'end', values=list(row))
+        # In Treeview sta doar o fereastra de VIEW_PAGE_SIZE randuri,
+        # iar scrollbar-ul reprezinta tot fisierul
+        rows = []
+        window = [0, 0]  # primul rand afisat, cate randuri sunt in fereastra
+
+        def render(start):
+            start = max(0, min(start, len(rows) - VIEW_PAGE_SIZE))
+            page = rows[start:start + VIEW_PAGE_SIZE]
+            window[:] = [start, len(page)]
+            tree.delete(*tree.get_children())
+            for row in page:
+                tree.insert('', 'end', values=row)
+
+        def jump_to(row):
+            render(row - VIEW_PAGE_SIZE // 2)
+            tree.yview_moveto((row - window[0]) / window[1])
+
+        def set_scrollbar(first, last):
+            # Fractiile Treeview sunt relative la fereastra; le convertim la tot fisierul
+            first, last = float(first), float(last)
+            start, shown = window
+            if not shown:
+                scrollbar_y.set(first, last)
+                return
+            scrollbar_y.set((start + first * shown) / len(rows),
+                            (start + last * shown) / len(rows))
+
+        def on_tree_scroll(first, last):
+            start, shown = window
+            # La marginea ferestrei o recentram pe randul curent
+            if shown and ((float(last) >= 1.0 and start + shown < len(rows))
+                          or (float(first) <= 0.0 and start > 0)):
+                jump_to(start + int(float(first) * shown))
+                return
+            set_scrollbar(first, last)
+
+        def on_scrollbar(*args):
+            if args[0] == 'moveto' and rows:
+                jump_to(min(int(float(args[1]) * len(rows)), len(rows) - 1))
+            else:
+                tree.yview(*args)
+
+        def add_rows(chunk):
+            rows.extend(chunk)
+            start, shown = window
+            # Completam fereastra daca nu e plina, altfel doar scrollbar-ul se schimba
+            for row in rows[start + shown:start + VIEW_PAGE_SIZE]:
+                tree.insert('', 'end', values=row)
+            window[1] = min(VIEW_PAGE_SIZE, len(rows) - start)
+            set_scrollbar(*tree.yview())
+
+        def load_next_chunk():
+            if not viewer.winfo_exists():
+                chunks.close()
+                return
+            try:
+                chunk = next(chunks, None)
+            except Exception as e:
+                logger.error("Error reading %s: %s", csv_path.name, e)
+                chunk = None
+            if chunk is None:
+                chunks.close()
+                return
+            add_rows(chunk)
+            viewer.after(0, load_next_chunk)
+
+        tree.configure(yscrollcommand=on_tree_scroll)
+        scrollbar_y.config(command=on_scrollbar)
+        add_rows(first_rows)
+        viewer.after(0, load_next_chunk)
 
         tree.pack(fill='both', expand=True)
-        print("DEBUG: CSV viewer created successfully")
+        logger.debug("CSV viewer created successfully")
 
     def open_csv_notepad(self):
         """Open CSV in notepad"""
@@ -1018,7 +1485,10 @@ class ModernApp:
         csv_path = self.data_manager.csv_dir / csv_filename
 
         if csv_path.exists():
-            os.system(f'notepad "{csv_path}"')
+            # Fara shell (caile cu spatii/ghilimele raman intacte), pornit de pe alt thread
+            threading.Thread(target=subprocess.Popen,
+                             args=(['notepad.exe', str(csv_path)],),
+                             kwargs={'close_fds': True}, daemon=True).start()
         else:
             messagebox.showerror('Eroare', 'Fisierul CSV nu a fost gasit')
 
@@ -1029,7 +1499,8 @@ class ModernApp:
             messagebox.showwarning('Warning', 'Select a document!')
             return
 
-        csv_filename = self.docs_tree.item(selection[0])['tags'][0]
+        item_tags = self.docs_tree.item(selection[0])['tags']
+        csv_filename = item_tags[0] if item_tags else None
 
         if not csv_filename or csv_filename == "N/A":
             messagebox.showinfo('Info', 'No CSV file available')
@@ -1038,7 +1509,8 @@ class ModernApp:
         csv_path = self.data_manager.csv_dir / csv_filename
 
         if csv_path.exists():
-            os.startfile(csv_path)
+            # Asocierea de fisier se rezolva in shell - nu blocam bucla Tk
+            threading.Thread(target=os.startfile, args=(str(csv_path),), daemon=True).start()
         else:
             messagebox.showerror('Eroare', 'Fisierul CSV nu a fost gasit')
 
@@ -1053,11 +1525,12 @@ class ModernApp:
                                    'Stergi acest document?\n(Se va sterge si CSV-ul si materialele din inventar)'):
             return
 
-        values = self.docs_tree.item(selection[0])['values']
-        doc_name = values[0]
+        # Un singur apel item() pentru valori si tags
+        info = self.docs_tree.item(selection[0])
+        doc_name = info['values'][0]
 
         # Get csv_filename from tags
-        item_tags = self.docs_tree.item(selection[0])['tags']
+        item_tags = info['tags']
         csv_filename = item_tags[0] if item_tags else None
 
         # Remove inventory items from this CSV
@@ -1065,47 +1538,47 @@ class ModernApp:
             csv_path = self.data_manager.csv_dir / csv_filename
             if csv_path.exists():
                 try:
-                    df = pd.read_csv(csv_path)
-                    print(f"DEBUG: CSV columns: {df.columns.tolist()}")
-                    print(f"DEBUG: CSV shape: {df.shape}")
-
-                    for idx, row in df.iterrows():
-                        desc = None
-                        qty_val = None
-
-                        if 'matched_description' in df.columns:
-                            desc = str(row['matched_description'])
-
-                        if 'quantity' in df.columns:
-                            qty_val = row['quantity']
-
-                        print(f"DEBUG: Row {idx}: desc={desc}, qty={qty_val}")
-
-                        if desc and desc != 'nan' and qty_val:
-                            try:
-                                qty = float(qty_val)
-
-                                if desc in self.data_manager.data["inventory"]:
-                                    print(f"DEBUG: Removing {qty} of '{desc}' from inventory")
-                                    self.data_manager.data["inventory"][desc] -= qty
-
-                                    if self.data_manager.data["inventory"][desc] <= 0:
-                                        print(f"DEBUG: Deleting '{desc}' from inventory (qty <= 0)")
-                                        del self.data_manager.data["inventory"][desc]
-                                else:
-                                    print(f"DEBUG: '{desc}' not found in inventory")
-                            except (ValueError, TypeError) as e:
-                                print(f"DEBUG: Error converting qty: {e}")
+                    with open(csv_path, newline="", encoding="utf-8") as f:
+                        reader = csv.DictReader(f)
+                        fieldnames = reader.fieldnames or []
+                        logger.debug("CSV columns: %s", fieldnames)
+                        has_desc = 'matched_description' in fieldnames
+                        has_qty = 'quantity' in fieldnames
+
+                        # Cantitatea totala per material; inventarul se modifica o data per material
+                        deltas = {}
+                        for idx, row in enumerate(reader):
+                            desc = row['matched_description'] if has_desc else None
+                            qty_val = row['quantity'] if has_qty else None
+
+                            logger.debug("Row %d: desc=%s, qty=%s", idx, desc, qty_val)
+
+                            if desc and desc != 'nan' and qty_val:
+                                try:
+                                    deltas[desc] = deltas.get(desc, 0.0) + float(qty_val)
+                                except (ValueError, TypeError) as e:
+                                    logger.debug("Error converting qty: %s", e)
+
+                    inventory = self.data_manager.data["inventory"]
+                    for desc, qty in deltas.items():
+                        if desc not in inventory:
+                            logger.debug("'%s' not found in inventory", desc)
+                            continue
+
+                        logger.debug("Removing %s of '%s' from inventory", qty, desc)
+                        remaining = inventory[desc] - qty
+                        if remaining <= 0:
+                            logger.debug("Deleting '%s' from inventory (qty <= 0)", desc)
+                            del inventory[desc]
+                        else:
+                            inventory[desc] = remaining
 
                     self.data_manager.save_data()
-                    print("DEBUG: Inventory saved")
+                    logger.debug("Inventory saved")
                 except Exception as e:
-                    print(f"Error removing inventory: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.exception("Error removing inventory: %s", e)
 
-        doc = next((d for d in self.data_manager.data["documents"]
-                    if d.get("name") == doc_name), None)
+        doc = self.data_manager.get_document(doc_name)
 
         if doc:
             self.data_manager.delete_document(doc)
@@ -1129,32 +1602,32 @@ class ModernApp:
             self.refresh_inventory()
             return
 
+        import pandas as pd
+
         processed = 0
         errors = 0
+        per_file = []
 
-        for csv_path in csv_files:
-            try:
-                df = pd.read_csv(csv_path)
-
-                for _, row in df.iterrows():
-                    if 'matched_description' in df.columns and 'quantity' in df.columns:
-                        desc = str(row['matched_description'])
-
-                        if desc and desc != 'nan':
-                            try:
-                                qty = float(row['quantity'])
-
-                                if desc in self.data_manager.data["inventory"]:
-                                    self.data_manager.data["inventory"][desc] += qty
-                                else:
-                                    self.data_manager.data["inventory"][desc] = qty
-                            except (ValueError, TypeError):
-                                pass
+        # Parsarea CSV-urilor e in C si elibereaza GIL-ul - fisierele se citesc in paralel
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            futures = {pool.submit(_csv_inventory_sums, csv_path): csv_path
+                       for csv_path in csv_files}
+            for future, csv_path in futures.items():
+                try:
+                    sums = future.result()
+                    if sums is not None:
+                        per_file.append(sums)
+                    processed += 1
+                except Exception as e:
+                    errors += 1
+                    logger.error("Error processing %s: %s", csv_path.name, e)
 
-                processed += 1
-            except Exception as e:
-                errors += 1
-                print(f"Error processing {csv_path.name}: {e}")
+        # O singura agregare peste toate fisierele
+        if per_file:
+            totals = pd.concat(per_file).groupby(level=0).sum()
+            self.data_manager.data["inventory"] = {
+                desc: float(qty) for desc, qty in totals.items() if desc
+            }
 
         self.data_manager.save_data()
         self.refresh_inventory()
@@ -1167,19 +1640,30 @@ class ModernApp:
 
     def refresh_inventory(self):
         """Refresh inventory display"""
-        for item in self.inventory_tree.get_children():
-            self.inventory_tree.delete(item)
+        tree = self.inventory_tree
+        # Un singur apel Tcl pentru toate randurile
+        tree.delete(*tree.get_children())
 
         inventory = self.data_manager.data["inventory"]
 
         if not inventory:
             return
 
-        for item_name, qty in sorted(inventory.items()):
-            self.inventory_tree.insert('', 'end', values=(
-                item_name,
-                f'{qty:.1f} units'
-            ))
+        # Ca la refresh_documents: coloanele ascunse cat timp inseram multe randuri
+        bulk = len(inventory) > BULK_INSERT_THRESHOLD
+        if bulk:
+            display_columns = tree['displaycolumns']
+            tree.configure(displaycolumns=())
+
+        try:
+            for item_name, qty in sorted(inventory.items()):
+                tree.insert('', 'end', values=(
+                    item_name,
+                    f'{qty:.1f} units'
+                ))
+        finally:
+            if bulk:
+                tree.configure(displaycolumns=display_columns)
 
     def delete_document(self):
         """Delete document"""
@@ -1194,8 +1678,7 @@ class ModernApp:
         values = self.docs_tree.item(selection[0])['values']
         doc_name = values[0]
 
-        doc = next((d for d in self.data_manager.data["documents"]
-                    if d.get("name") == doc_name), None)
+        doc = self.data_manager.get_document(doc_name)
 
         if doc:
             self.data_manager.delete_document(doc)
@@ -1206,6 +1689,7 @@ class ModernApp:
 # ==================== MAIN ====================
 
 def main():
+    logging.basicConfig(level=logging.WARNING)
     root = tk.Tk()
     app = ModernApp(root)
     root.mainloop()
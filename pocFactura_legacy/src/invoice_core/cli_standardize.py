@@ -7,10 +7,17 @@ import sys
 from matcher import match_descriptions
 from ubl_lines import extract_lines
 
-try:
-    from config import GEMINI_API_KEY as CONFIG_API_KEY
-except ImportError:
-    CONFIG_API_KEY = None
+# Raspunsurile Gemini se pastreaza aici intre rulari (fisier shelve)
+DEFAULT_GEMINI_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "invoice_matcher", "gemini_results")
+
+
+def _config_api_key():
+    """Cheia din config.py / GEMINI_API_KEY - citita doar cand Gemini e activ."""
+    try:
+        from config import get_gemini_api_key
+    except ImportError:
+        return os.getenv("GEMINI_API_KEY")
+    return get_gemini_api_key()
 
 
 def main():
@@ -30,10 +37,17 @@ def main():
     parser.add_argument("--min-score", type=float, default=0.18, help="Scor minim fuzzy match")
     parser.add_argument("--gemini-threshold", type=float, default=0.30,
                         help="Foloseste Gemini AI cand scorul fuzzy e sub acest prag (default: 0.30)")
+    parser.add_argument("--min-margin", type=float, default=0.15,
+                        help="Sub prag, accepta fuzzy fara Gemini daca primul candidat il depaseste "
+                             "pe al doilea cu mai mult de atat (default: 0.15)")
     parser.add_argument("--no-gemini", action="store_true",
                         help="Dezactiveaza analiza Gemini AI (foloseste doar matching fuzzy)")
     parser.add_argument("--gemini-api-key", type=str, default=None,
                         help="Cheia API Gemini (sau seteaza in config.py sau variabila GEMINI_API_KEY)")
+    parser.add_argument("--gemini-cache", default=DEFAULT_GEMINI_CACHE,
+                        help=f"Fisierul cu raspunsurile Gemini refolosite intre rulari (default: {DEFAULT_GEMINI_CACHE})")
+    parser.add_argument("--no-gemini-cache", action="store_true",
+                        help="Nu citi si nu scrie raspunsurile Gemini pe disc")
 
     args = parser.parse_args()
 
@@ -57,11 +71,14 @@ def main():
         print(f"  [EROARE] {e}")
         return 1
 
-    gemini_api_key = args.gemini_api_key or CONFIG_API_KEY or os.getenv("GEMINI_API_KEY")
+    gemini_api_key = None
+    if not args.no_gemini:
+        gemini_api_key = args.gemini_api_key or _config_api_key()
 
     print(f"\n[3/4] Potrivire denumiri...")
     print(f"  Prag fuzzy: {args.min_score}")
     print(f"  Prag Gemini: {args.gemini_threshold}")
+    print(f"  Marja minima: {args.min_margin}")
 
     if args.no_gemini:
         print(f"  Gemini AI: Dezactivat")
@@ -79,7 +96,9 @@ def main():
             min_score=args.min_score,
             gemini_threshold=args.gemini_threshold,
             use_gemini=not args.no_gemini,
-            gemini_api_key=gemini_api_key
+            gemini_api_key=gemini_api_key,
+            min_margin=args.min_margin,
+            gemini_cache_path=None if args.no_gemini_cache else args.gemini_cache
         )
     except Exception as e:
         print(f"  [EROARE] {e}")
@@ -3,10 +3,18 @@
 Fisier de configurare pentru API keys si setari.
 """
 
+import os
+
 # Gemini API Key
 # Obtine cheia de la: https://aistudio.google.com/app/apikey
 GEMINI_API_KEY = "AIzaSyC_pune_cheia_ta_aici"
 
+
+def get_gemini_api_key():
+    """Cheia Gemini: variabila de mediu GEMINI_API_KEY, altfel valoarea de mai sus."""
+    return os.environ.get("GEMINI_API_KEY") or GEMINI_API_KEY
+
+
 # Setari matching
 DEFAULT_MIN_SCORE = 0.18
 DEFAULT_GEMINI_THRESHOLD = 0.30
@@ -5,20 +5,91 @@ Analizeaza top 5 candidati si selecteaza cel mai potrivit cod sau niciun cod.
 """
 
 import os
+import re
+import dbm
 import json
-from typing import List, Dict, Optional
+import shelve
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
 import google.generativeai as genai
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# Primul obiect / prima lista JSON din raspuns, ignorand markdown si textul din jur
+_JSON_OBJ_RE = re.compile(r'\{.*\}', re.DOTALL)
+_JSON_LIST_RE = re.compile(r'\[.*\]', re.DOTALL)
+_DECODER = json.JSONDecoder()
+
+# Peste acest scor fuzzy, primul candidat e acceptat fara apel Gemini
+HIGH_CONFIDENCE_SCORE = 0.9
+
+# Cate raspunsuri Gemini (descriere + coduri candidate) se pastreaza in memorie
+RESULT_CACHE_SIZE = 1024
+
+
+def _decode_first(pattern: re.Pattern, text: str):
+    """Decodeaza prima valoare JSON gasita de pattern; textul de dupa ea e ignorat."""
+    match = pattern.search(text)
+    if match is None:
+        raise ValueError("raspunsul nu contine JSON")
+    value, _ = _DECODER.raw_decode(match.group(0))
+    return value
+
+
+def _index_by_code(candidates: List[Dict]) -> Dict[str, Dict]:
+    """Cod (ca text, cum il returneaza Gemini) -> candidat; la coduri duplicate castiga primul."""
+    by_code = {}
+    for c in candidates:
+        by_code.setdefault(str(c["matched_code"]), c)
+    return by_code
+
+
+def _cache_key(description: str, candidates: List[Dict]) -> Tuple:
+    """Cheia de cache: descrierea normalizata si codurile primilor 5 candidati."""
+    return " ".join(description.lower().split()), tuple(str(c["matched_code"]) for c in candidates[:5])
+
+
+def _try_lock(handle) -> bool:
+    """Blocare exclusiva, fara asteptare; False daca fisierul e tinut de alt proces."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _store_key(key: Tuple) -> str:
+    """Cheia din shelve: blake2b peste descriere si coduri (lungime fixa, sigura ca nume dbm)."""
+    description, codes = key
+    payload = "\x1f".join((description,) + codes).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
 
 class GeminiMatcher:
     """Matcher inteligent folosind Gemini API pentru cazuri cu confidence scazut."""
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+            self,
+            api_key: Optional[str] = None,
+            cache_path: Optional[os.PathLike] = None
+    ):
         """
         Initialializeaza matcher-ul Gemini.
 
         Args:
             api_key: Cheia API Gemini. Daca None, citeste din variabila GEMINI_API_KEY.
+            cache_path: Fisierul shelve cu raspunsurile anterioare, refolosit intre rulari.
+                None (implicit) pastreaza raspunsurile doar in memorie.
         """
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
 
@@ -27,8 +98,72 @@ class GeminiMatcher:
                 "Cheia API Gemini nu a fost gasita. Furnizeaza-o ca argument sau seteaza variabila GEMINI_API_KEY."
             )
 
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        # Clientul se construieste la primul apel (vezi _get_model)
+        self._model = None
+        # LRU: (descriere, coduri candidate) -> rezultat Gemini; loturile pot rula pe mai multe thread-uri
+        self._cache: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Shelve-ul se deschide la prima cautare in cache, cu un fisier .lock tinut cat e deschis
+        self._cache_path = cache_path
+        self._store = None
+        self._store_lock = None
+        self._store_dirty = False
+
+    def __enter__(self) -> "GeminiMatcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _get_store(self):
+        """Deschide cache-ul pe disc (apelat sub self._lock); None daca e dezactivat sau inaccesibil."""
+        if self._store is None and self._cache_path is not None:
+            path = Path(self._cache_path)
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # Backend-urile dbm nu se protejeaza intre procese - un singur scriitor odata
+                lock = open(str(path) + ".lock", "a+b")
+                if not _try_lock(lock):
+                    lock.close()
+                    print("[ATENTIE] Cache Gemini pe disc folosit de alt proces - raman doar in memorie")
+                    self._cache_path = None
+                    return None
+                try:
+                    self._store = shelve.open(str(path))
+                except BaseException:
+                    lock.close()
+                    raise
+                self._store_lock = lock
+            except (OSError, *dbm.error) as e:
+                print(f"[ATENTIE] Cache Gemini pe disc indisponibil: {e}")
+                self._cache_path = None
+        return self._store
+
+    def _sync_store(self) -> None:
+        """Scrie pe disc raspunsurile noi - o data per lot, nu per raspuns."""
+        with self._lock:
+            if self._store is not None and self._store_dirty:
+                self._store.sync()
+                self._store_dirty = False
+
+    def close(self) -> None:
+        """Inchide cache-ul pe disc si elibereaza fisierul .lock."""
+        with self._lock:
+            if self._store is not None:
+                self._store.close()
+                self._store = None
+                self._store_dirty = False
+            if self._store_lock is not None:
+                self._store_lock.close()
+                self._store_lock = None
+
+    def _get_model(self):
+        """Configureaza genai si creeaza modelul la prima analiza."""
+        with self._lock:
+            if self._model is None:
+                genai.configure(api_key=self.api_key)
+                self._model = genai.GenerativeModel('gemini-pro')
+            return self._model
 
     def analyze_candidates(
             self,
@@ -52,19 +187,143 @@ class GeminiMatcher:
         if not candidates_to_analyze:
             return self._create_no_match_result(product_description)
 
+        known = self._known_result(product_description, candidates_to_analyze)
+        if known is not None:
+            return known
+
+        by_code = _index_by_code(candidates_to_analyze)
         prompt = self._build_analysis_prompt(product_description, candidates_to_analyze)
 
         try:
-            response = self.model.generate_content(prompt)
+            response = self._get_model().generate_content(prompt)
 
-            result = self._parse_gemini_response(response.text, candidates_to_analyze)
+            result = self._parse_gemini_response(response.text, candidates_to_analyze, by_code)
             result["ai_method"] = "gemini"
+            self._remember(product_description, candidates_to_analyze, result)
+            self._sync_store()
 
             return result
 
         except Exception as e:
             print(f"Eroare API Gemini: {e}")
-            return self._create_fallback_result(candidates_to_analyze[0], str(e))
+            # Cererea a plecat - linia ramane numarata ca trimisa la Gemini
+            return dict(self._create_fallback_result(candidates_to_analyze[0], str(e)), ai_method="gemini")
+
+    def analyze_candidates_batch(
+            self,
+            items: List[Tuple[str, List[Dict]]],
+            min_candidates: int = 5
+    ) -> List[Dict]:
+        """
+        Analizeaza mai multe produse intr-un singur apel Gemini.
+
+        Args:
+            items: Lista de (denumire produs din factura, candidati din matching-ul fuzzy)
+            min_candidates: Numarul minim de candidati de trimis per produs (default: 5)
+
+        Returns:
+            Cate un rezultat ca la analyze_candidates pentru fiecare element din items, in aceeasi ordine
+        """
+        prepared = [
+            (description, candidates[:max(min_candidates, len(candidates))])
+            for description, candidates in items
+        ]
+
+        results: List[Optional[Dict]] = [None] * len(prepared)
+        pending = []
+        duplicates = {}  # pozitie -> pozitia primei linii identice din lot
+        first_by_key = {}
+        for i, (description, candidates) in enumerate(prepared):
+            if not candidates:
+                results[i] = self._create_no_match_result(description)
+                continue
+
+            known = self._known_result(description, candidates)
+            if known is not None:
+                results[i] = known
+                continue
+
+            key = _cache_key(description, candidates)
+            if key in first_by_key:
+                duplicates[i] = first_by_key[key]
+            else:
+                first_by_key[key] = i
+                pending.append(i)
+
+        if pending:
+            self._analyze_pending(prepared, pending, results)
+
+        for i, first in duplicates.items():
+            results[i] = dict(results[first])
+            if results[i].get("ai_method") == "gemini":
+                results[i]["ai_method"] = "cache"  # raspuns refolosit, linia nu a fost trimisa
+
+        return results
+
+    def _analyze_pending(self, prepared: List[Tuple[str, List[Dict]]], pending: List[int],
+                         results: List[Optional[Dict]]) -> None:
+        """Trimite produsele de la pozitiile pending intr-un singur prompt si completeaza results."""
+        batch = [prepared[i] for i in pending]
+        prompt = self._build_batch_prompt(batch)
+
+        try:
+            response = self._get_model().generate_content(prompt)
+
+            parsed = self._parse_gemini_batch_response(
+                response.text, [candidates for _, candidates in batch]
+            )
+            for (description, candidates), result in zip(batch, parsed):
+                result["ai_method"] = "gemini"
+                self._remember(description, candidates, result)
+            self._sync_store()
+
+        except Exception as e:
+            print(f"Eroare API Gemini: {e}")
+            parsed = [dict(self._create_fallback_result(candidates[0], str(e)), ai_method="gemini")
+                      for _, candidates in batch]
+
+        for i, result in zip(pending, parsed):
+            results[i] = result
+
+    def _known_result(self, description: str, candidates: List[Dict]) -> Optional[Dict]:
+        """Rezultat fara apel API: primul candidat are scor sigur sau raspunsul e deja in cache."""
+        if candidates[0]["score"] >= HIGH_CONFIDENCE_SCORE:
+            return self._create_fuzzy_accepted_result(candidates[0])
+
+        key = _cache_key(description, candidates)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+            else:
+                store = self._get_store()
+                cached = store.get(_store_key(key)) if store is not None else None
+                if cached is None:
+                    return None
+                self._put_in_memory(key, cached)
+
+        # ai_method "cache": raspuns Gemini anterior, fara cerere noua
+        return dict(cached, ai_method="cache")
+
+    def _remember(self, description: str, candidates: List[Dict], result: Dict) -> None:
+        """Pastreaza doar raspunsurile reale Gemini - erorile se reincearca la urmatorul apel."""
+        if result.get("status") not in ("gemini_analyzed", "gemini_no_match"):
+            return
+        key = _cache_key(description, candidates)
+        with self._lock:
+            self._put_in_memory(key, dict(result))
+
+            store = self._get_store()
+            if store is not None:
+                store[_store_key(key)] = dict(result)
+                self._store_dirty = True
+
+    def _put_in_memory(self, key: Tuple, result: Dict) -> None:
+        """Adauga in LRU-ul din memorie (apelat sub self._lock)."""
+        self._cache[key] = result
+        self._cache.move_to_end(key)
+        if len(self._cache) > RESULT_CACHE_SIZE:
+            self._cache.popitem(last=False)
 
     def _build_analysis_prompt(self, description: str, candidates: List[Dict]) -> str:
         """Build the analysis prompt for Gemini in Romanian."""
@@ -112,64 +371,143 @@ Niveluri de confidence:
 
         return prompt
 
-    def _parse_gemini_response(self, response_text: str, candidates: List[Dict]) -> Dict:
+    def _build_batch_prompt(self, items: List[Tuple[str, List[Dict]]]) -> str:
+        """Build one Gemini prompt covering several invoice products."""
+
+        products_text = "\n\n".join(
+            f"PRODUS {index}: \"{description}\"\n" + "\n".join(
+                f"  {i + 1}. Cod: {c['matched_code']} | Denumire: {c['matched_description']} | Scor fuzzy: {c['score']:.2f}"
+                for i, c in enumerate(candidates)
+            )
+            for index, (description, candidates) in enumerate(items)
+        )
+
+        prompt = f"""Esti expert in potrivirea descrierilor de produse din facturi cu o baza de date de referinta.
+
+Mai jos sunt {len(items)} produse din factura, fiecare cu codurile candidate alese de algoritmul fuzzy:
+
+{products_text}
+
+SARCINA TA:
+Pentru FIECARE produs, ALEGE cel mai potrivit cod dintre candidatii LUI.
+
+REGULI STRICTE:
+1. Pentru fiecare produs poti alege DOAR unul din codurile listate sub el
+2. Daca NICIUN cod nu se potriveste produsului, returneaza "selected_code": null
+3. Nu inventa coduri noi - foloseste EXACT codul din lista sau null
+
+Criterii de evaluare:
+- Categoria de produs si materiale
+- Specificatii tehnice (daca exista)
+- Utilizarea finala a produsului
+- Termeni specifici industriei
+
+RASPUNDE DOAR cu o lista JSON, cate un obiect pentru fiecare produs, in acest format EXACT (fara markdown, fara text extra):
+[
+  {{
+    "index": 0,
+    "selected_code": "codul ales SAU null",
+    "confidence": 0.85,
+    "reasoning": "Explicatie scurta in romana de ce ai ales acest cod (max 100 cuvinte)"
+  }}
+]
+
+Niveluri de confidence:
+- 0.9-1.0: Potrivire foarte sigura
+- 0.7-0.9: Potrivire buna cu mica incertitudine
+- 0.5-0.7: Potrivire acceptabila, recomand verificare manuala
+- Sub 0.5: Incertitudine mare, necesita verificare manuala
+- 0.0: Niciun cod nu se potriveste (selected_code: null)"""
+
+        return prompt
+
+    def _parse_gemini_response(self, response_text: str, candidates: List[Dict],
+                               by_code: Optional[Dict[str, Dict]] = None) -> Dict:
         """Parse Gemini's JSON response."""
 
         try:
-            response_text = response_text.strip()
-
-            if response_text.startswith("```"):
-                lines = response_text.split("\n")
-                json_lines = []
-                in_json = False
-                for line in lines:
-                    if line.strip().startswith("{"):
-                        in_json = True
-                    if in_json:
-                        json_lines.append(line)
-                    if line.strip().endswith("}"):
-                        break
-                response_text = "\n".join(json_lines)
-
-            gemini_result = json.loads(response_text)
-
-            selected_code = gemini_result.get("selected_code")
-            confidence = float(gemini_result.get("confidence", 0.5))
-            reasoning = gemini_result.get("reasoning", "Nicio explicatie furnizata")
-
-            if selected_code is None or selected_code == "null":
-                return {
-                    "matched_code": None,
-                    "matched_description": None,
-                    "confidence": confidence,
-                    "reasoning": reasoning,
-                    "status": "gemini_no_match"
-                }
-
-            selected_candidate = next(
-                (c for c in candidates if c["matched_code"] == selected_code),
-                None
+            gemini_result = _decode_first(_JSON_OBJ_RE, response_text)
+
+            return self._result_from_selection(
+                gemini_result, candidates, by_code if by_code is not None else _index_by_code(candidates)
             )
 
-            if selected_candidate is None:
-                print(f"[ATENTIE] Gemini a ales un cod invalid: {selected_code}")
-                return self._create_fallback_result(
-                    candidates[0],
-                    f"AI a ales un cod invalid ({selected_code}) care nu era in lista"
-                )
+        except (json.JSONDecodeError, KeyError, ValueError) as e:
+            print(f"Eroare la parsarea raspunsului Gemini: {e}")
+            print(f"Raspuns brut: {response_text[:200]}")
+            return self._create_fallback_result(candidates[0], "Nu s-a putut parsa raspunsul AI")
+
+    def _parse_gemini_batch_response(self, response_text: str, candidates_list: List[List[Dict]]) -> List[Dict]:
+        """Parse Gemini's JSON list response for a batch, one result per product."""
+
+        try:
+            entries = _decode_first(_JSON_LIST_RE, response_text)
+            if not isinstance(entries, list):
+                raise ValueError("raspunsul nu este o lista JSON")
 
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"Eroare la parsarea raspunsului Gemini: {e}")
+            print(f"Raspuns brut: {response_text[:200]}")
+            return [self._create_fallback_result(candidates[0], "Nu s-a putut parsa raspunsul AI")
+                    for candidates in candidates_list]
+
+        by_index = {}
+        for entry in entries:
+            if isinstance(entry, dict):
+                try:
+                    by_index.setdefault(int(entry["index"]), entry)
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+        results = []
+        for index, candidates in enumerate(candidates_list):
+            entry = by_index.get(index)
+            if entry is None:
+                results.append(self._create_fallback_result(
+                    candidates[0], "AI nu a returnat un raspuns pentru acest produs"
+                ))
+                continue
+            try:
+                results.append(self._result_from_selection(entry, candidates, _index_by_code(candidates)))
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Eroare la parsarea raspunsului Gemini (produs {index}): {e}")
+                results.append(self._create_fallback_result(candidates[0], "Nu s-a putut parsa raspunsul AI"))
+
+        return results
+
+    def _result_from_selection(self, gemini_result: Dict, candidates: List[Dict],
+                               by_code: Dict[str, Dict]) -> Dict:
+        """Map one decoded Gemini answer to a match result."""
+
+        selected_code = gemini_result.get("selected_code")
+        confidence = float(gemini_result.get("confidence", 0.5))
+        reasoning = gemini_result.get("reasoning", "Nicio explicatie furnizata")
+
+        if selected_code is None or selected_code == "null":
             return {
-                "matched_code": selected_candidate["matched_code"],
-                "matched_description": selected_candidate["matched_description"],
+                "matched_code": None,
+                "matched_description": None,
                 "confidence": confidence,
                 "reasoning": reasoning,
-                "status": "gemini_analyzed"
+                "status": "gemini_no_match"
             }
 
-        except (json.JSONDecodeError, KeyError, ValueError) as e:
-            print(f"Eroare la parsarea raspunsului Gemini: {e}")
-            print(f"Raspuns brut: {response_text[:200]}")
-            return self._create_fallback_result(candidates[0], "Nu s-a putut parsa raspunsul AI")
+        selected_candidate = by_code.get(str(selected_code))
+
+        if selected_candidate is None:
+            print(f"[ATENTIE] Gemini a ales un cod invalid: {selected_code}")
+            return self._create_fallback_result(
+                candidates[0],
+                f"AI a ales un cod invalid ({selected_code}) care nu era in lista"
+            )
+
+        return {
+            "matched_code": selected_candidate["matched_code"],
+            "matched_description": selected_candidate["matched_description"],
+            "confidence": confidence,
+            "reasoning": reasoning,
+            "status": "gemini_analyzed"
+        }
 
     def _create_fallback_result(self, best_candidate: Dict, error_msg: str) -> Dict:
         """Create fallback result using best fuzzy match."""
@@ -181,6 +519,16 @@ Niveluri de confidence:
             "status": "gemini_fallback"
         }
 
+    def _create_fuzzy_accepted_result(self, best_candidate: Dict) -> Dict:
+        """Create result for a fuzzy match strong enough to skip Gemini."""
+        return {
+            "matched_code": best_candidate["matched_code"],
+            "matched_description": best_candidate["matched_description"],
+            "confidence": best_candidate["score"],
+            "reasoning": "Scor fuzzy ridicat - analiza Gemini nu a fost necesara.",
+            "status": "fuzzy_accepted"
+        }
+
     def _create_no_match_result(self, description: str) -> Dict:
         """Create result when no candidates are available."""
         return {
@@ -1,7 +1,73 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
-from difflib import SequenceMatcher
+from rapidfuzz import process, fuzz, utils
 from typing import List, Dict, Optional
 
+# Cate linii cu confidence scazut se trimit intr-un singur prompt Gemini
+GEMINI_BATCH_SIZE = 10
+
+# Cate loturi Gemini sunt in zbor simultan (apelurile sunt I/O, nu CPU)
+GEMINI_MAX_CONCURRENT = 4
+
+# Cati candidati fuzzy se pastreaza per linie (si se trimit la Gemini)
+TOP_CANDIDATES = 5
+
+
+def _top_indices(row: np.ndarray, k: int) -> List[int]:
+    """Pozitiile celor mai mari k scoruri, descrescator; la egalitate castiga pozitia mai mica."""
+    k = min(k, len(row))
+    if k == 0:
+        return []
+    kth = np.partition(row, -k)[-k]
+    above = np.flatnonzero(row > kth)
+    ties = np.flatnonzero(row == kth)[:k - len(above)]
+    return sorted(np.concatenate([above, ties]).tolist(), key=lambda j: (-row[j], j))
+
+
+def _runner_up_score(query: str, choices: List[str]) -> float:
+    """Al doilea cel mai bun scor (0-100) fata de toate codurile, fara cutoff; 0 daca nu exista."""
+    top = process.extract(query, choices, scorer=fuzz.ratio, processor=None, limit=2)
+    return float(top[1][1]) if len(top) >= 2 else 0.0
+
+
+def _normalize(value) -> str:
+    """default_process + cuvinte sortate: fuzz.ratio pe aceasta forma = token_sort_ratio."""
+    return " ".join(sorted(utils.default_process(str(value)).split()))
+
+
+def prepare_reference(df_codes: pd.DataFrame) -> Dict:
+    """
+    Preproceseaza tabelul de coduri o singura data, pentru apeluri repetate.
+
+    Args:
+        df_codes: DataFrame cu coduri de referinta (prima coloana cod, a doua denumire)
+
+    Returns:
+        Dict cu codurile, denumirile originale, forma lor normalizata si indexul exact
+    """
+    if len(df_codes.columns) < 2:
+        raise ValueError("Fisierul Excel trebuie sa aiba cel putin doua coloane (cod si denumire).")
+
+    # Cele doua coloane se copiaza o singura data in liste simple, dupa pozitie;
+    # dupa acest punct potrivirea nu mai atinge DataFrame-ul
+    descriptions = df_codes.iloc[:, 1].tolist()
+    choices = [_normalize(desc) for desc in descriptions]
+
+    # Forma normalizata -> prima pozitie din tabel (pentru potrivirea exacta)
+    exact = {}
+    for j, choice in enumerate(choices):
+        exact.setdefault(choice, j)
+
+    return {
+        "codes": df_codes.iloc[:, 0].tolist(),
+        "descriptions": descriptions,
+        "choices": choices,
+        "exact": exact
+    }
+
 
 def match_descriptions(
         lines: List[Dict],
@@ -9,11 +75,15 @@ def match_descriptions(
         min_score: float = 0.18,
         gemini_threshold: float = 0.30,
         use_gemini: bool = True,
-        gemini_api_key: Optional[str] = None
+        gemini_api_key: Optional[str] = None,
+        reference: Optional[Dict] = None,
+        min_margin: Optional[float] = 0.15,
+        gemini_cache_path: Optional[str] = None
 ) -> List[Dict]:
     """
     Potriveste fiecare linie din factura cu cel mai apropiat cod din Excel.
-    Foloseste Gemini AI pentru cazuri cu confidence scazut (scor < gemini_threshold).
+    Foloseste Gemini AI pentru cazuri cu confidence scazut (scor < gemini_threshold),
+    cu exceptia celor unde primul candidat il depaseste clar pe al doilea (> min_margin).
 
     Args:
         lines: Lista de linii din factura de potrivit
@@ -22,23 +92,28 @@ def match_descriptions(
         gemini_threshold: Daca cel mai bun rezultat < aceasta, foloseste Gemini AI (default: 0.30)
         use_gemini: Activeaza analiza Gemini AI (default: True)
         gemini_api_key: Cheia API Gemini (optional)
+        reference: Rezultatul prepare_reference(df_codes), refolosit intre apeluri (optional)
+        min_margin: Diferenta minima fata de al doilea candidat pentru a accepta fuzzy
+            sub prag fara Gemini; None dezactiveaza (default: 0.15)
+        gemini_cache_path: Fisier pentru raspunsurile Gemini refolosite intre rulari;
+            None le pastreaza doar in memorie (default: None)
 
     Returns:
         Lista de linii cu coduri potrivite si scoruri de confidence
     """
-    cols = list(df_codes.columns)
-    if len(cols) < 2:
-        raise ValueError("Fisierul Excel trebuie sa aiba cel putin doua coloane (cod si denumire).")
-
-    code_col, desc_col = cols[0], cols[1]
+    if reference is None:
+        reference = prepare_reference(df_codes)
 
     gemini_matcher = None
     if use_gemini:
         try:
-            from gemini_matcher import GeminiMatcher
-            gemini_matcher = GeminiMatcher(api_key=gemini_api_key)
+            from gemini_patcher import GeminiMatcher
+            gemini_matcher = GeminiMatcher(api_key=gemini_api_key, cache_path=gemini_cache_path)
             print(f"[OK] Gemini AI activat (prag: {gemini_threshold})")
-        except ImportError:
+        except ImportError as e:
+            # Doar lipsa pachetului Gemini dezactiveaza analiza; alte importuri esuate sunt bug-uri
+            if e.name not in ("google", "google.generativeai"):
+                raise
             print("[ATENTIE] google-generativeai nu este instalat. Ruleaza: pip install google-generativeai")
             use_gemini = False
         except ValueError as e:
@@ -46,24 +121,64 @@ def match_descriptions(
             use_gemini = False
 
     results = []
-    gemini_calls = 0
+    gemini_calls = 0  # doar liniile trimise efectiv intr-un lot Gemini
+    gemini_cached = 0
+    gemini_sent = Counter()  # rezultatul liniilor trimise: acceptate / respinse
+    gemini_pending = []  # (linie, top candidati, cel mai bun match fuzzy)
+
+    codes = reference["codes"]
+    descriptions = reference["descriptions"]
+
+    # Descrierile repetate pe factura se trateaza o singura data; inverse duce rezultatul inapoi la linie
+    cutoff = min_score * 100
+    unique_queries, inverse = np.unique(
+        np.array([_normalize(line.get("description", "")) for line in lines], dtype=object),
+        return_inverse=True,
+    )
+    unique_queries = unique_queries.tolist()
 
-    for line in lines:
-        input_desc = str(line.get("description", "")).lower()
+    # Runda 1: potrivire exacta prin dictionar (scor 100), fara niciun calcul fuzzy
+    exact_idx = np.array([reference["exact"].get(q, -1) for q in unique_queries], dtype=np.intp)
+    pending = np.flatnonzero(exact_idx < 0)
 
-        matches = []
-        for _, row in df_codes.iterrows():
-            score = SequenceMatcher(None, input_desc, str(row[desc_col]).lower()).ratio()
-            if score >= min_score:
-                matches.append({
-                    "matched_code": row[code_col],
-                    "matched_description": row[desc_col],
-                    "score": round(score, 4)
-                })
+    # Runda 2: matricea ramase x coduri intr-un singur apel nativ (scoruri 0-100).
+    # Ambele parti sunt deja normalizate, deci fuzz.ratio aici este exact token_sort_ratio.
+    # Sub score_cutoff rapidfuzz opreste calculul devreme si scrie 0
+    pending_queries = [unique_queries[u] for u in pending]
+    scores = process.cdist(
+        pending_queries,
+        reference["choices"],
+        scorer=fuzz.ratio,
+        dtype=np.float32,
+        score_cutoff=cutoff,
+        workers=-1,  # rapidfuzz elibereaza GIL-ul - randurile se impart pe toate nucleele
+    )
 
-        matches.sort(key=lambda x: x["score"], reverse=True)
+    # Decizia per linie intr-o singura trecere NumPy: fara potriviri / Gemini / fuzzy direct
+    # argmax ia prima pozitie la egalitate, la fel ca _top_indices si indexul exact
+    row_of = np.full(len(unique_queries), -1, dtype=np.intp)
+    row_of[pending] = np.arange(len(pending))
+    unique_idx = exact_idx.copy()
+    unique_scores = np.full(len(unique_queries), 100.0, dtype=np.float32)
+    if scores.shape[1]:
+        unique_idx[pending] = scores.argmax(axis=1)
+        unique_scores[pending] = scores[np.arange(len(pending)), unique_idx[pending]]
+    else:
+        unique_idx[pending] = 0
+        unique_scores[pending] = 0.0
 
-        if not matches:
+    best_idx = unique_idx[inverse]
+    best_scores = unique_scores[inverse]
+    # Fara coduri nu exista potriviri, nici cu min_score=0 (scorurile de mai sus sunt doar umplutura)
+    has_match = (best_scores >= cutoff) & bool(codes)
+    # Potrivirile exacte nu ajung niciodata la Gemini
+    need_ai = (has_match & (exact_idx < 0)[inverse] & (best_scores / 100.0 < gemini_threshold)
+               & bool(use_gemini and gemini_matcher))
+
+    rows = zip(lines, row_of[inverse].tolist(), best_idx.tolist(), best_scores.tolist(),
+               has_match.tolist(), need_ai.tolist())
+    for line, q, j, best, matched, ai in rows:
+        if not matched:
             line["matched_code"] = None
             line["matched_description"] = None
             line["score"] = 0.0
@@ -71,43 +186,108 @@ def match_descriptions(
             results.append(line)
             continue
 
-        best_match = matches[0]
+        if ai:
+            # Lista de candidati se construieste doar pentru liniile trimise la Gemini
+            row = scores[q]
+            matches = [
+                {
+                    "matched_code": codes[k],
+                    "matched_description": descriptions[k],
+                    "score": round(float(row[k]) / 100.0, 4)
+                }
+                for k in _top_indices(row, TOP_CANDIDATES)
+                if row[k] >= cutoff
+            ]
+            best_match = matches[0]
+            # Al doilea candidat se compara cu scorul lui real - in matrice, sub cutoff apare ca 0.
+            # Liniile ajung aici doar cu scor < gemini_threshold, deci sunt putine
+            if (min_margin is not None and best_match["score"]
+                    - round(_runner_up_score(pending_queries[q], reference["choices"]) / 100.0, 4) > min_margin):
+                # Castigator clar chiar sub prag - Gemini nu ar avea ce decide
+                line.update(best_match)
+                line["status"] = "fuzzy_high_margin"
+            else:
+                # Analiza Gemini se face dupa bucla, in loturi de GEMINI_BATCH_SIZE linii
+                gemini_pending.append((line, matches, best_match))
+        else:
+            score = round(best / 100.0, 4)
+            line["matched_code"] = codes[j]
+            line["matched_description"] = descriptions[j]
+            line["score"] = score
+            line["status"] = "potrivit_fuzzy" if score >= gemini_threshold else "fuzzy_confidence_scazut"
 
-        if use_gemini and gemini_matcher and best_match["score"] < gemini_threshold:
-            try:
-                top_candidates = matches[:5]
-                gemini_result = gemini_matcher.analyze_candidates(
-                    product_description=line.get("description", ""),
-                    candidates=top_candidates
-                )
+        results.append(line)
 
-                line["matched_code"] = gemini_result["matched_code"]
-                line["matched_description"] = gemini_result["matched_description"]
-                line["score"] = gemini_result["confidence"]
-                line["status"] = gemini_result["status"]
-                line["reasoning"] = gemini_result.get("reasoning", "")
-                line["fuzzy_score"] = best_match["score"]  # Keep original fuzzy score
+    batches = [gemini_pending[start:start + GEMINI_BATCH_SIZE]
+               for start in range(0, len(gemini_pending), GEMINI_BATCH_SIZE)]
 
-                gemini_calls += 1
-                status_icon = "[X]" if gemini_result["matched_code"] is None else "[OK]"
-                print(f"  [AI] Analiza Gemini #{gemini_calls} {status_icon}: {line.get('description', '')[:50]}... -> {line['matched_code']}")
+    # Toate loturile pleaca deodata; rezultatele se aplica in ordinea liniilor.
+    # Cache-ul pe disc al matcher-ului se deschide abia aici si se inchide oricum s-ar termina
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(GEMINI_MAX_CONCURRENT, len(batches)))) as pool:
+            futures = [
+                pool.submit(
+                    gemini_matcher.analyze_candidates_batch,
+                    [(line.get("description", ""), top_candidates) for line, top_candidates, _ in batch]
+                )
+                for batch in batches
+            ]
+    finally:
+        if gemini_matcher is not None:
+            gemini_matcher.close()
 
-            except Exception as e:
-                print(f"  [EROARE] Gemini: {e}. Folosesc matching-ul fuzzy.")
+    gemini_log = []  # afisate o singura data, dupa ce toate loturile sunt aplicate
+    for batch, future in zip(batches, futures):
+        try:
+            gemini_results = future.result()
+        except Exception as e:
+            gemini_log.append(f"  [EROARE] Gemini: {e}. Folosesc matching-ul fuzzy.")
+            # Lotul a fost trimis - liniile lui intra la "Analizate", ca erori
+            gemini_calls += len(batch)
+            gemini_sent["eroare"] += len(batch)
+            for line, _, best_match in batch:
                 line.update(best_match)
                 line["status"] = "eroare_gemini_fallback"
-        else:
-            line.update(best_match)
-            line["status"] = "potrivit_fuzzy" if best_match["score"] >= gemini_threshold else "fuzzy_confidence_scazut"
+            continue
 
-        results.append(line)
+        for (line, _, best_match), gemini_result in zip(batch, gemini_results):
+            line["matched_code"] = gemini_result["matched_code"]
+            line["matched_description"] = gemini_result["matched_description"]
+            line["score"] = gemini_result["confidence"]
+            line["status"] = gemini_result["status"]
+            line["reasoning"] = gemini_result.get("reasoning", "")
+            line["fuzzy_score"] = best_match["score"]  # Keep original fuzzy score
+
+            status_icon = "[X]" if gemini_result["matched_code"] is None else "[OK]"
+            method = gemini_result.get("ai_method")
+            if method == "gemini":
+                gemini_calls += 1
+                if gemini_result["status"] == "gemini_no_match":
+                    gemini_sent["respins"] += 1
+                elif gemini_result["status"] == "gemini_analyzed" and gemini_result["matched_code"]:
+                    gemini_sent["acceptat"] += 1
+                elif gemini_result["status"] == "gemini_fallback":
+                    gemini_sent["eroare"] += 1
+                gemini_log.append(f"  [AI] Analiza Gemini #{gemini_calls} {status_icon}: {line.get('description', '')[:50]}... -> {line['matched_code']}")
+            elif method == "cache":
+                gemini_cached += 1
+                gemini_log.append(f"  [CACHE] Raspuns Gemini anterior {status_icon}: {line.get('description', '')[:50]}... -> {line['matched_code']}")
+
+    if gemini_log:
+        print("\n".join(gemini_log))
+
+    # O singura trecere peste rezultate pentru toate contoarele din sumar
+    tally = Counter(r.get("status") for r in results)
 
     print(f"\n[SUMAR] Potriviri:")
     print(f"  Total linii: {len(results)}")
-    print(f"  Fuzzy confidence ridicat: {sum(1 for r in results if r.get('status') == 'potrivit_fuzzy')}")
+    print(f"  Fuzzy confidence ridicat: {tally['potrivit_fuzzy']}")
+    print(f"  Fuzzy sub prag, marja mare: {tally['fuzzy_high_margin']}")
     print(f"  Analizate de Gemini: {gemini_calls}")
-    print(f"    Acceptate: {sum(1 for r in results if r.get('status') == 'gemini_analyzed' and r.get('matched_code'))}")
-    print(f"    Respinse (null): {sum(1 for r in results if r.get('status') == 'gemini_no_match')}")
-    print(f"  Fara potriviri: {sum(1 for r in results if r.get('status') == 'fara_potriviri')}")
+    print(f"    Acceptate: {gemini_sent['acceptat']}")
+    print(f"    Respinse (null): {gemini_sent['respins']}")
+    print(f"    Erori (fuzzy pastrat): {gemini_sent['eroare']}")
+    print(f"  Raspunsuri Gemini din cache (fara cerere): {gemini_cached}")
+    print(f"  Fara potriviri: {tally['fara_potriviri']}")
 
     return results
\ No newline at end of file
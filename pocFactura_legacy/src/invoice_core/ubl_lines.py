@@ -1,21 +1,56 @@
 import xml.etree.ElementTree as ET
 
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+NS = {'cbc': 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2',
+      'cac': 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2'}
+INVOICE_LINE = '{%s}InvoiceLine' % NS['cac']
+
+# Campurile unei linii: cale relativa la cac:InvoiceLine + valoare implicita
+FIELDS = (("description", 'cac:Item/cbc:Description', ''),
+          ("quantity", 'cbc:InvoicedQuantity', '0'),
+          ("unit_price", 'cac:Price/cbc:PriceAmount', '0'),
+          ("line_total", 'cbc:LineExtensionAmount', '0'))
+
+if etree is not None:
+    # XPath compilat o singura data - namespace-urile nu se mai rezolva per linie
+    _XPATHS = [(key, etree.XPath(path, namespaces=NS), default)
+               for key, path, default in FIELDS]
+
+
+def _line_dict(i, item):
+    line = {"line_id": str(i)}
+    for key, path, default in FIELDS:
+        line[key] = item.findtext(path, default=default, namespaces=NS)
+    return line
+
+
+def _line_dict_xpath(i, item):
+    line = {"line_id": str(i)}
+    for key, xpath, default in _XPATHS:
+        # Ca findtext: textul primului element gasit ('' daca e gol), altfel implicitul
+        found = xpath(item)
+        line[key] = (found[0].text or '') if found else default
+    return line
+
+
 def extract_lines(xml_path):
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-    ns = {'cbc': 'urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2',
-          'cac': 'urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2'}
+    if etree is None:
+        tree = ET.parse(xml_path)
+        return [_line_dict(i, item)
+                for i, item in enumerate(tree.getroot().findall('.//cac:InvoiceLine', NS), 1)]
+
+    # Parsare in flux: fiecare InvoiceLine e eliberat dupa citire.
+    # Entitatile externe si reteaua sunt oprite explicit (lxml < 5 le rezolva implicit)
     lines = []
-    for i, item in enumerate(root.findall('.//cac:InvoiceLine', ns), 1):
-        desc = item.findtext('cac:Item/cbc:Description', default='', namespaces=ns)
-        qty = item.findtext('cbc:InvoicedQuantity', default='0', namespaces=ns)
-        price = item.findtext('cac:Price/cbc:PriceAmount', default='0', namespaces=ns)
-        total = item.findtext('cbc:LineExtensionAmount', default='0', namespaces=ns)
-        lines.append({
-            "line_id": str(i),
-            "description": desc,
-            "quantity": qty,
-            "unit_price": price,
-            "line_total": total
-        })
-    return lines
\ No newline at end of file
+    context = etree.iterparse(str(xml_path), events=('end',), tag=INVOICE_LINE,
+                              resolve_entities=False, no_network=True)
+    for i, (_, item) in enumerate(context, 1):
+        lines.append(_line_dict_xpath(i, item))
+        item.clear(keep_tail=True)
+        while item.getprevious() is not None:
+            del item.getparent()[0]
+    return lines
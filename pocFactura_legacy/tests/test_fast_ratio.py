@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "Document_Scanner"))
+
+import _fast_ratio  # noqa: E402
+
+np = pytest.importorskip("numpy")
+fuzz = pytest.importorskip("rapidfuzz.fuzz")
+process = pytest.importorskip("rapidfuzz.process")
+
+
+@pytest.fixture(params=["python", "numba"])
+def implementation(request, monkeypatch):
+    """best_matches pe varianta Python pura sau pe kernel-ul numba"""
+    if request.param == "python":
+        monkeypatch.setattr(_fast_ratio, "_numba", False)
+    elif not _fast_ratio.has_numba():
+        pytest.skip("numba nu este instalat")
+    return request.param
+
+
+def _random_strings(rng, count, max_len):
+    # Alfabet mic: multe scoruri egale, deci si egalitati la alegerea celui mai bun
+    return [''.join(rng.choice('abc ') for _ in range(rng.randint(0, max_len))) for _ in range(count)]
+
+
+def _expected(queries, choices, min_score):
+    """Referinta: argmax pe matricea rapidfuzz (prima pozitie la egalitate)"""
+    if not choices:
+        return [None] * len(queries)
+    scores = process.cdist(queries, choices, scorer=fuzz.ratio, processor=None,
+                           dtype=np.float64)
+    expected = []
+    for row in scores:
+        j = int(np.argmax(row))
+        expected.append((j, row[j] / 100) if row[j] >= min_score * 100 else None)
+    return expected
+
+
+def _assert_same(actual, expected):
+    assert len(actual) == len(expected)
+    for got, want in zip(actual, expected):
+        if want is None:
+            assert got is None
+        else:
+            assert got is not None
+            assert got[0] == want[0]
+            assert got[1] == pytest.approx(want[1], abs=1e-9)
+
+
+@pytest.mark.parametrize("min_score", [0.0, 0.18, 0.5, 0.9])
+def test_best_matches_agrees_with_rapidfuzz(implementation, min_score):
+    rng = random.Random(7)
+    # Peste 64 si 128 de caractere: pattern-ul ocupa mai multe cuvinte de 64 de biti
+    queries = _random_strings(rng, 40, 150) + ["", "a" * 65, "ab" * 70]
+    choices = _random_strings(rng, 120, 150) + ["", "a" * 64, "ab" * 70]
+
+    _assert_same(_fast_ratio.best_matches(queries, choices, min_score),
+                 _expected(queries, choices, min_score))
+
+
+def test_ties_pick_the_first_choice(implementation):
+    assert _fast_ratio.best_matches(["abc"], ["xbc", "abc", "abc"], 0.18) == [(1, 1.0)]
+    assert _fast_ratio.best_matches(["ab"], ["ac", "bb"], 0.18) == [(0, 0.5)]
+
+
+def test_empty_strings(implementation):
+    # Ca rapidfuzz: doua siruri goale sunt identice, un sir gol fata de unul nevid - 0
+    assert _fast_ratio.best_matches([""], ["", "abc"], 0.5) == [(0, 1.0)]
+    assert _fast_ratio.best_matches([""], ["abc"], 0.0) == [(0, 0.0)]
+    assert _fast_ratio.best_matches(["abc"], [], 0.0) == [None]
+    assert _fast_ratio.best_matches([], ["abc"], 0.0) == []
+
+
+def test_min_score_is_inclusive(implementation):
+    # ratio("ab", "ac") = 0.5 exact
+    assert _fast_ratio.best_matches(["ab"], ["ac"], 0.5) == [(0, 0.5)]
+    assert _fast_ratio.best_matches(["ab"], ["ac"], 0.51) == [None]
+
+
+def test_ratio_matches_rapidfuzz():
+    rng = random.Random(3)
+    for a, b in zip(_random_strings(rng, 300, 140), _random_strings(rng, 300, 140)):
+        assert _fast_ratio.ratio(a, b) * 100 == pytest.approx(fuzz.ratio(a, b), abs=1e-9)
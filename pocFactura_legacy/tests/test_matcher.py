@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import json
+import sys
+import types
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "invoice_core"))
+
+import matcher  # noqa: E402
+
+try:
+    import google.generativeai  # noqa: F401
+except ImportError:
+    # gemini_patcher importa pachetul la incarcare; modelul real nu e folosit in teste
+    _google = types.ModuleType("google")
+    _google.generativeai = types.ModuleType("google.generativeai")
+    sys.modules["google"] = _google
+    sys.modules["google.generativeai"] = _google.generativeai
+
+import gemini_patcher  # noqa: E402
+
+
+class FakeGeminiMatcher:
+    """Inlocuieste GeminiMatcher: inregistreaza liniile trimise, fara niciun apel API."""
+
+    sent = []
+
+    def __init__(self, api_key=None, cache_path=None):
+        pass
+
+    def analyze_candidates_batch(self, items):
+        FakeGeminiMatcher.sent.extend(description for description, _ in items)
+        return [{"matched_code": candidates[0]["matched_code"],
+                 "matched_description": candidates[0]["matched_description"],
+                 "confidence": 0.5, "reasoning": "", "status": "gemini_analyzed",
+                 "ai_method": "gemini"}
+                for _, candidates in items]
+
+    def close(self):
+        pass
+
+
+class FakeModel:
+    """Raspunde la promptul de lot alegand codul "B" pentru fiecare produs."""
+
+    prompts = []
+
+    def generate_content(self, prompt):
+        FakeModel.prompts.append(prompt)
+        count = prompt.count("PRODUS ")
+        answer = [{"index": i, "selected_code": "B", "confidence": 0.8, "reasoning": "test"}
+                  for i in range(count)]
+        return types.SimpleNamespace(text=json.dumps(answer))
+
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    monkeypatch.setattr(gemini_patcher, "GeminiMatcher", FakeGeminiMatcher)
+    FakeGeminiMatcher.sent = []
+    return FakeGeminiMatcher
+
+
+def test_clear_winner_below_threshold_skips_gemini(fake_gemini):
+    # Cel mai bun ~0.27 (sub pragul Gemini), al doilea 0 - sub min_score, deci nu apare in candidati
+    df = pd.DataFrame({"cod": ["A", "B"], "denumire": ["abcxyz", "qqqq"]})
+
+    line, = matcher.match_descriptions([{"description": "abcdefghijklmnop"}], df, gemini_api_key="k")
+
+    assert line["status"] == "fuzzy_high_margin"
+    assert line["matched_code"] == "A"
+    assert fake_gemini.sent == []
+
+
+def test_close_runner_up_goes_to_gemini(fake_gemini):
+    # ~0.27 fata de ~0.18: diferenta sub min_margin, Gemini decide
+    df = pd.DataFrame({"cod": ["A", "B"], "denumire": ["abcxyz", "abqrst"]})
+
+    line, = matcher.match_descriptions([{"description": "abcdefghijklmnop"}], df, gemini_api_key="k")
+
+    assert line["status"] == "gemini_analyzed"
+    assert fake_gemini.sent == ["abcdefghijklmnop"]
+
+
+def test_low_confidence_lines_go_through_real_gemini_matcher(monkeypatch):
+    monkeypatch.setattr(gemini_patcher.GeminiMatcher, "_get_model", lambda self: FakeModel())
+    FakeModel.prompts = []
+    df = pd.DataFrame({"cod": ["A", "B"], "denumire": ["abcxyz", "abqrst"]})
+    lines = [{"description": "abcdefghijklmnop"}, {"description": "abcdefghijklmnoq"}]
+
+    out = matcher.match_descriptions(lines, df, gemini_api_key="k")
+
+    # Ambele linii intr-un singur lot, raspunsul mapat inapoi pe fiecare linie
+    assert len(FakeModel.prompts) == 1
+    assert [line["status"] for line in out] == ["gemini_analyzed", "gemini_analyzed"]
+    assert [line["matched_code"] for line in out] == ["B", "B"]
+    assert all(line["fuzzy_score"] < 0.30 for line in out)
+
+
+def test_empty_code_table_with_zero_min_score_has_no_matches():
+    df = pd.DataFrame({"cod": [], "denumire": []})
+
+    line, = matcher.match_descriptions([{"description": "abc"}], df, min_score=0, use_gemini=False)
+
+    assert line["status"] == "fara_potriviri"
+    assert line["matched_code"] is None
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "Document_Scanner"))
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("openpyxl")
+
+import invoice_scanner_pro  # noqa: E402
+
+
+@pytest.fixture
+def data_manager(tmp_path, monkeypatch):
+    # DataManager scrie app_data/ in directorul curent
+    monkeypatch.chdir(tmp_path)
+    return invoice_scanner_pro.DataManager()
+
+
+def test_single_column_workbook_reports_two_column_message(data_manager, tmp_path):
+    excel = tmp_path / "coduri.xlsx"
+    pd.DataFrame({"cod": ["A", "B"]}).to_excel(excel, index=False)
+
+    with pytest.raises(ValueError, match="minim 2 coloane"):
+        data_manager._load_reference(excel)
+
+
+def test_only_first_two_columns_are_kept(data_manager, tmp_path):
+    excel = tmp_path / "coduri.xlsx"
+    pd.DataFrame({"cod": ["A", "B"], "denumire": ["x", "y"], "extra": ["1", "2"]}).to_excel(excel, index=False)
+
+    df_codes, reference = data_manager._load_reference(excel)
+
+    assert list(df_codes.columns) == ["cod", "denumire"]
+    assert reference["codes"] == ["A", "B"]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "invoice_core"))
+
+import ubl_lines  # noqa: E402
+
+INVOICE = """<?xml version="1.0"?>
+<!DOCTYPE Invoice [<!ENTITY secret SYSTEM "{secret}">]>
+<Invoice xmlns:cac="urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2"
+         xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2">
+  <cac:InvoiceLine>
+    <cbc:InvoicedQuantity>2</cbc:InvoicedQuantity>
+    <cbc:LineExtensionAmount>10.00</cbc:LineExtensionAmount>
+    <cac:Item><cbc:Description>Rigips &secret;</cbc:Description></cac:Item>
+    <cac:Price><cbc:PriceAmount>5.00</cbc:PriceAmount></cac:Price>
+  </cac:InvoiceLine>
+</Invoice>
+"""
+
+
+def test_external_entities_are_not_resolved(tmp_path):
+    secret = tmp_path / "secret.txt"
+    secret.write_text("SECRET", encoding="utf-8")
+    xml_path = tmp_path / "factura.xml"
+    xml_path.write_text(INVOICE.format(secret=secret.as_uri()), encoding="utf-8")
+
+    line, = ubl_lines.extract_lines(xml_path)
+
+    assert "SECRET" not in line["description"]
+    assert (line["quantity"], line["unit_price"], line["line_total"]) == ("2", "5.00", "10.00")
+
+
+def test_sample_invoice_lines():
+    lines = ubl_lines.extract_lines(Path(__file__).resolve().parents[1] / "facuraTst.xml")
+
+    assert [line["line_id"] for line in lines] == ["1", "2", "3", "4"]
+    assert lines[0]["description"] == "rig. verde"